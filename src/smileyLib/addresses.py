@@ -0,0 +1,132 @@
+import hashlib
+from concurrent.futures import ProcessPoolExecutor
+
+BASE58_ALPHABET = '123456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz'
+BASE58_INDEX = {character: index for index, character in enumerate(BASE58_ALPHABET)}
+
+# The version bytes of smileycoin addresses
+PUBKEY_ADDRESS = 25
+SCRIPT_ADDRESS = 5
+
+
+def doubleSha256(data):
+    return hashlib.sha256(hashlib.sha256(data).digest()).digest()
+
+
+def hash160(data):
+    return hashlib.new('ripemd160', hashlib.sha256(data).digest()).digest()
+
+
+def b58encode(data):
+    """
+    Encodes bytes as a base58 string.
+    """
+    number = int.from_bytes(data, 'big')
+    characters = []
+    while number:
+        number, remainder = divmod(number, 58)
+        characters.append(BASE58_ALPHABET[remainder])
+    zeros = len(data) - len(bytes(data).lstrip(b'\0'))
+    return '1' * zeros + ''.join(reversed(characters))
+
+
+def b58decode(string):
+    """
+    Decodes a base58 string to bytes, raising ValueError for characters outside the alphabet.
+    """
+    number = 0
+    for character in string:
+        try:
+            number = number * 58 + BASE58_INDEX[character]
+        except KeyError:
+            raise ValueError(f'Invalid base58 character {character!r}') from None
+    zeros = len(string) - len(string.lstrip('1'))
+    return b'\0' * zeros + number.to_bytes((number.bit_length() + 7) // 8, 'big')
+
+
+def b58encodeCheck(payload):
+    """
+    Encodes bytes as a base58 string with a four byte checksum appended.
+    """
+    payload = bytes(payload)
+    return b58encode(payload + doubleSha256(payload)[:4])
+
+
+def b58decodeCheck(string):
+    """
+    Decodes a base58 string with a checksum, raising ValueError if the checksum does not match.
+    """
+    data = b58decode(string)
+    if len(data) < 4 or doubleSha256(data[:-4])[:4] != data[-4:]:
+        raise ValueError('Invalid base58 checksum')
+    return data[:-4]
+
+
+def hashToAddress(hash, version=PUBKEY_ADDRESS):
+    """
+    Returns the address of a 20 byte public key or script hash.
+    """
+    return b58encodeCheck(bytes([version]) + bytes(hash))
+
+
+def decodeAddress(address, versions=(PUBKEY_ADDRESS, SCRIPT_ADDRESS)):
+    """
+    Decodes an address into its version byte and the 20 byte hash it pays to,
+    raising ValueError if it is not a valid address with one of *versions*.
+    """
+    if not isinstance(address, str) or not 26 <= len(address) <= 35:
+        raise ValueError(f'Invalid address length: {address!r}')
+    payload = b58decodeCheck(address)
+    if len(payload) != 21 or payload[0] not in versions:
+        raise ValueError(f'Invalid address version: {address!r}')
+    return payload[0], payload[1:]
+
+
+def isValidAddress(address):
+    """
+    Checks an address locally, version byte and checksum, without calling the server.
+    """
+    try:
+        decodeAddress(address)
+    except ValueError:
+        return False
+    return True
+
+
+def checkAddress(address):
+    """
+    Returns the fields of the *validateaddress* result that do not depend on the wallet.
+    """
+    try:
+        version, _ = decodeAddress(address)
+    except ValueError:
+        return {'isvalid': False}
+    return {'isvalid': True, 'address': address, 'isscript': version == SCRIPT_ADDRESS}
+
+
+def validateChunk(addresses):
+    return [isValidAddress(address) for address in addresses]
+
+
+def validateAddresses(addresses, processes=None, chunkSize=10000):
+    """
+    Checks many addresses locally.
+    ___
+    ## Args:
+
+    * **addresses**: The addresses to check
+
+    * **processes**: (optional) The number of worker processes to spread long lists over, by default the list is checked in this process
+
+    * **chunkSize**: (optional) The number of addresses handed to a worker process at a time
+
+    ## Returns:
+
+    * A list of booleans, true for every valid address
+    """
+    addresses = list(addresses)
+    if not processes or len(addresses) <= chunkSize:
+        return validateChunk(addresses)
+    chunks = [addresses[start:start + chunkSize] for start in range(0, len(addresses), chunkSize)]
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        return [valid for chunk in executor.map(validateChunk, chunks) for valid in chunk]
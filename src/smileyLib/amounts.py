@@ -0,0 +1,18 @@
+from decimal import Decimal
+
+# The number of satoshis in one smileycoin
+COIN = 100000000
+
+
+def toSatoshi(amount):
+    """
+    Converts an amount of smileycoins, as returned by the rpc calls, to an integer number of satoshis.
+    """
+    return int(round(Decimal(str(amount)) * COIN))
+
+
+def fromSatoshi(satoshi):
+    """
+    Converts an integer number of satoshis to an amount of smileycoins accepted by the rpc calls.
+    """
+    return float(Decimal(satoshi) / COIN)
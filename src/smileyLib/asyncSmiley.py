@@ -0,0 +1,130 @@
+import asyncio
+from .smileyLib import smiley
+from .transport import AsyncTransport
+from .resilience import IDEMPOTENT_METHODS, isTransient, backoffDelay
+from .coalesce import AsyncSingleFlight
+
+
+class AsyncSmiley(smiley):
+    """
+    An asyncio counterpart of *smiley*. Every rpc method of *smiley* is available with the
+    same arguments but returns a coroutine, so many calls can be in flight on one event loop.
+    ```
+    client = AsyncSmiley(options)
+    blocks = await asyncio.gather(*[client.getblock(hash) for hash in hashes])
+    ```
+    Takes the same options as *smiley* and additionally:
+    ```
+    options = {
+        maxInFlight: int            # (optional) Maximum number of concurrent requests to the server, defaults to 100
+    }
+    ```
+    Timeouts, retries and the circuit breaker are configured as for *smiley*, a timed out call raises asyncio.TimeoutError.
+    The nodes and cache options are not supported, nor are batches, deadlines, streaming and the
+    helpers built on blocking calls: *iterTransactions*, *iterBlocks*, *exportColumns* and *map*.
+    Calls can also be given their own deadline with `asyncio.wait_for`, cancelling a call closes its connection.
+    """
+
+    def _createTransport(self, options):
+        return AsyncTransport(
+            self.rpcHost,
+            self.rpcPort,
+            self.rpcUser,
+            self.rpcPassword,
+            maxInFlight=options.get('maxInFlight', 100),
+            path=self.rpcSocket
+        )
+
+    def _createNodePool(self, options):
+        if options.get('nodes'):
+            raise NotImplementedError('Multiple nodes are not supported by AsyncSmiley')
+        return None
+
+    def _createCaches(self, options):
+        for option in ('cacheMaxBytes', 'cachePath', 'volatileCache'):
+            if options.get(option):
+                raise NotImplementedError(f'The {option} option is not supported by AsyncSmiley')
+        return None, None
+
+    async def _send(self, method, body, idempotent):
+        attempt = 0
+        while True:
+            if self.circuitBreaker is not None:
+                self.circuitBreaker.before()
+            error = None
+            try:
+                status, content = await self.transport.post(body, self.methodTimeouts.get(method, self.timeout))
+            except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError) as exception:
+                error = exception
+            except BaseException:
+                # Cancelled calls, e.g. by asyncio.wait_for, still have to end a trial call of the circuit breaker
+                if self.circuitBreaker is not None:
+                    self.circuitBreaker.failure()
+                raise
+            if error is None and not isTransient(status, content):
+                if self.circuitBreaker is not None:
+                    self.circuitBreaker.success()
+                return status, content
+            if self.circuitBreaker is not None:
+                self.circuitBreaker.failure()
+            if not idempotent or attempt >= self.retries:
+                if error is not None:
+                    raise error
+                return status, content
+            await asyncio.sleep(backoffDelay(attempt, self.retryBackoff, self.retryBackoffMax))
+            attempt += 1
+
+    def _createSingleFlight(self):
+        return AsyncSingleFlight()
+
+    async def _rpc(self, method, params):
+        body = self._encodeRequest(method, params)
+        idempotent = method in IDEMPOTENT_METHODS
+        if self.singleFlight is not None and idempotent:
+            status, body = await self.singleFlight.do(body, lambda: self._send(method, body, True))
+        else:
+            status, body = await self._send(method, body, idempotent)
+        return self._decodeResponse(status, body)
+
+    async def _rpcBatch(self, calls):
+        ids, data = self._encodeBatch(calls)
+        idempotent = all(method in IDEMPOTENT_METHODS for method, _ in calls)
+        status, body = await self._send('batch', data, idempotent)
+        return self._decodeBatch(calls, ids, status, body)
+
+    def batch(self, chunkSize=None):
+        raise NotImplementedError('Batches are not supported by AsyncSmiley, use asyncio.gather instead')
+
+    def deadline(self, seconds):
+        raise NotImplementedError('Deadlines are not supported by AsyncSmiley, use asyncio.wait_for instead')
+
+    def stream(self, method, *args, **kwargs):
+        raise NotImplementedError('Streaming is not supported by AsyncSmiley')
+
+    def iterTransactions(self, account='*', pageSize=100, limit=None, since=None, prefetch=True):
+        raise NotImplementedError('iterTransactions is not supported by AsyncSmiley, use smiley instead')
+
+    def iterBlocks(self, *args, **kwargs):
+        raise NotImplementedError('iterBlocks is not supported by AsyncSmiley, use smiley instead')
+
+    def exportColumns(self, *args, **kwargs):
+        raise NotImplementedError('exportColumns is not supported by AsyncSmiley, use smiley instead')
+
+    def map(self, method, argumentIterable, concurrency=8, ordered=True, returnExceptions=False):
+        raise NotImplementedError('map is not supported by AsyncSmiley, use asyncio.gather instead')
+
+    async def close(self):
+        """
+        Closes the pooled connections to the server.
+        The client can also be used as an async context manager that closes it on exit.
+        """
+        await self.transport.close()
+
+    def __enter__(self):
+        raise NotImplementedError('Use AsyncSmiley with async with')
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, excType, excValue, traceback):
+        await self.close()
@@ -0,0 +1,112 @@
+import copy
+from concurrent.futures import Future
+
+
+class Batch:
+    """
+    Collects calls made on the normal *smiley* method surface and sends them to the server
+    as json rpc batch requests, *chunkSize* calls per http round trip.
+
+    Every queued call returns a `concurrent.futures.Future` which is resolved once the batch is sent.
+    Calls that the server answers with an error resolve to an *RPCError* without affecting the rest.
+    ```
+    with client.batch() as batch:
+        hashes = [batch.getblockhash(height) for height in range(1000)]
+    print([future.result() for future in hashes])
+    ```
+    ___
+    ## Args:
+
+    * **client**: The smiley client to send the calls with
+
+    * **chunkSize**: The maximum number of calls sent in a single http request
+    """
+
+    def __init__(self, client, chunkSize=500):
+        self.client = client
+        self.chunkSize = chunkSize
+        self.calls = []
+        self.futures = []
+        self.proxy = copy.copy(client)
+        self.proxy._rpc = self.add
+
+    def __getattr__(self, name):
+        if name == 'proxy':
+            raise AttributeError(name)
+        return getattr(self.proxy, name)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, excType, excValue, traceback):
+        if excType is None:
+            self.send()
+        else:
+            self.cancel()
+
+    def __len__(self):
+        return len(self.calls)
+
+    def add(self, method, params=[]):
+        """
+        Queues a single call.
+        ___
+        ## Args:
+
+        * **method**: The rpc method to call
+
+        * **params**: The parameters of the call
+
+        ## Returns:
+
+        * A future resolving to the result of the call
+        """
+        future = Future()
+        self.calls.append((method, params))
+        self.futures.append(future)
+        return future
+
+    def send(self):
+        """
+        Sends every queued call and resolves their futures.
+
+        ## Returns:
+
+        * The futures of the sent calls, in the order they were queued
+        """
+        calls, futures = self.calls, self.futures
+        self.calls, self.futures = [], []
+        for start in range(0, len(calls), self.chunkSize):
+            chunk = calls[start:start + self.chunkSize]
+            chunkFutures = futures[start:start + self.chunkSize]
+            try:
+                outcomes = self.client._rpcBatch(chunk)
+            except Exception as error:
+                for future in chunkFutures:
+                    future.set_exception(error)
+                continue
+            for future, outcome in zip(chunkFutures, outcomes):
+                if isinstance(outcome, Exception):
+                    future.set_exception(outcome)
+                else:
+                    future.set_result(outcome)
+        return futures
+
+    def results(self):
+        """
+        Sends every queued call and waits for the results.
+
+        ## Returns:
+
+        * A list with the result of each call in the order they were queued,
+        or the *RPCError* for calls that failed
+        """
+        return [future.exception() or future.result() for future in self.send()]
+
+    def cancel(self):
+        """
+        Drops every queued call without sending it.
+        """
+        for future in self.futures:
+            future.cancel()
+        self.calls, self.futures = [], []
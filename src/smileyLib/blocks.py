@@ -0,0 +1,103 @@
+import json
+import os
+
+from .errors import ChainReorganized
+from .fanout import fanOut
+
+
+def readCheckpoint(path):
+    try:
+        with open(path) as file:
+            checkpoint = json.load(file)
+    except FileNotFoundError:
+        return None
+    return checkpoint['height'], checkpoint['hash']
+
+
+def writeCheckpoint(path, height, blockHash):
+    temporary = path + '.tmp'
+    with open(temporary, 'w') as file:
+        json.dump({'height': height, 'hash': blockHash}, file)
+    os.replace(temporary, path)
+
+
+def fetchBlocks(client, heights, verbose):
+    with client.batch() as batch:
+        hashes = [batch.getblockhash(height) for height in heights]
+    with client.batch() as batch:
+        blocks = [batch.getblock(future.result(), verbose) for future in hashes]
+    return [(future.result(), block.result()) for future, block in zip(hashes, blocks)]
+
+
+def iterBlocks(client, start=0, end=None, batchSize=50, concurrency=4, verbose=True,
+               checkpoint=None, checkpointEvery=100):
+    """
+    Walks the blocks from height *start* to *end* in height order.
+
+    The heights are split into chunks of *batchSize* blocks, each chunk is fetched with one batched
+    *getblockhash* and one batched *getblock* request, and *concurrency* chunks are fetched at the same time.
+    At most *concurrency* chunks are held in memory, fetching pauses while the consumer catches up.
+
+    Every block is checked to follow the one before it. If the chain is reorganized below a block that was
+    already handed out *ChainReorganized* is raised, otherwise the changed chunk is fetched again.
+    ___
+    ## Args:
+
+    * **client**: The smiley client to fetch the blocks with
+
+    * **start**: (optional) The height of the first block
+
+    * **end**: (optional) The height of the last block, defaults to the tip when the walk starts
+
+    * **batchSize**: (optional) The number of blocks fetched per batch request
+
+    * **concurrency**: (optional) The number of batches fetched at the same time
+
+    * **verbose**: (optional) Passed on to *getblock*, if false blocks are hex strings and are not checked to follow each other
+
+    * **checkpoint**: (optional) The path of a file the last handed out block is recorded in, a walk with an existing checkpoint resumes after it
+
+    * **checkpointEvery**: (optional) The number of blocks between checkpoint writes
+
+    ## Returns:
+
+    * A generator of (height, hash, block) tuples
+    """
+    previous = None
+    if checkpoint is not None:
+        saved = readCheckpoint(checkpoint)
+        if saved is not None:
+            height, previous = saved
+            if client.getblockhash(height) != previous:
+                raise ChainReorganized(height)
+            start = height + 1
+    if end is None:
+        end = client.getblockcount()
+    chunks = (range(low, min(low + batchSize, end + 1)) for low in range(start, end + 1, batchSize))
+    last = None
+    try:
+        for heights, fetched in zip(
+                range(start, end + 1, batchSize),
+                fanOut(lambda heights: fetchBlocks(client, heights, verbose), chunks, concurrency)):
+            if verbose and not follows(fetched, previous):
+                # The chain changed while the chunk was in flight, only the chunk itself may be refetched
+                fetched = fetchBlocks(client, range(heights, heights + len(fetched)), verbose)
+                if not follows(fetched, previous):
+                    raise ChainReorganized(heights)
+            for offset, (blockHash, block) in enumerate(fetched):
+                yield heights + offset, blockHash, block
+                last = heights + offset, blockHash
+                if checkpoint is not None and (heights + offset + 1) % checkpointEvery == 0:
+                    writeCheckpoint(checkpoint, *last)
+            previous = fetched[-1][0]
+    finally:
+        if checkpoint is not None and last is not None:
+            writeCheckpoint(checkpoint, *last)
+
+
+def follows(fetched, previous):
+    for blockHash, block in fetched:
+        if previous is not None and block.get('previousblockhash') != previous:
+            return False
+        previous = blockHash
+    return True
@@ -0,0 +1,249 @@
+import json
+import threading
+import time
+from collections import OrderedDict
+
+# Methods whose results can be cached once they are known to be immutable
+CACHED_METHODS = frozenset(['getblock', 'getblockhash', 'getrawtransaction', 'decoderawtransaction', 'decodescript'])
+
+
+class LRUCache:
+    """
+    A thread-safe least recently used cache bounded by the approximate number of bytes it holds.
+    Values are byte strings, so the size of an entry is the length of its value.
+    ___
+    ## Args:
+
+    * **maxBytes**: The number of bytes the cache may hold before the least recently used entries are evicted
+    """
+
+    def __init__(self, maxBytes):
+        self.maxBytes = maxBytes
+        self.entries = OrderedDict()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            value = self.entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        size = len(value)
+        if size > self.maxBytes:
+            return
+        with self.lock:
+            previous = self.entries.pop(key, None)
+            if previous is not None:
+                self.bytes -= len(previous)
+            self.entries[key] = value
+            self.bytes += size
+            while self.bytes > self.maxBytes:
+                _, evicted = self.entries.popitem(last=False)
+                self.bytes -= len(evicted)
+                self.evictions += 1
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.bytes = 0
+
+    def stats(self):
+        """
+        ## Returns:
+
+        * A dict with the hits, misses, evictions, entries and bytes of the cache
+        """
+        with self.lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'entries': len(self.entries),
+                'bytes': self.bytes
+            }
+
+
+class ChainCache:
+    """
+    Caches the answers of calls for chain data that can no longer change.
+
+    * *decoderawtransaction* and *decodescript* are pure functions of their arguments.
+    * *getblock* and *getrawtransaction* are content addressed. Raw hex answers are always kept,
+    verbose answers only once they have *confirmations* confirmations, so fields like *nextblockhash*
+    are settled. Cached verbose answers keep the confirmation count they had when they were cached.
+    * *getblockhash* answers are kept for heights at least *confirmations* blocks below the tip,
+    deep enough to survive reorgs. The tip height is refreshed with *tipHeight* at most every *tipMaxAge* seconds.
+    ___
+    ## Args:
+
+    * **store**: The cache holding the answers, e.g. an *LRUCache*
+
+    * **tipHeight**: A function returning the current block count of the node
+
+    * **confirmations**: (optional) The confirmation depth after which chain data is considered immutable
+
+    * **tipMaxAge**: (optional) Seconds a known tip height is used before it is refreshed
+    """
+
+    def __init__(self, store, tipHeight, confirmations=6, tipMaxAge=5):
+        self.store = store
+        self.tipHeight = tipHeight
+        self.confirmations = confirmations
+        self.tipMaxAge = tipMaxAge
+        self.height = None
+        self.heightCheckedAt = None
+
+    def key(self, method, params):
+        if method not in CACHED_METHODS:
+            return None
+        if method in ('getblock', 'getrawtransaction') and params[1:]:
+            params = [params[0], bool(params[1])]
+        return method + json.dumps(params, separators=(',', ':'))
+
+    def lookup(self, method, params):
+        """
+        ## Returns:
+
+        * A tuple of the cache key of the call, None when the call is never cached,
+        and the cached response body, None on a miss
+        """
+        key = self.key(method, params)
+        if key is None:
+            return None, None
+        return key, self.store.get(key)
+
+    def currentHeight(self):
+        now = time.monotonic()
+        if self.heightCheckedAt is None or now - self.heightCheckedAt > self.tipMaxAge:
+            height = self.tipHeight()
+            if height is not None:
+                self.height, self.heightCheckedAt = height, now
+        return self.height
+
+    def isImmutable(self, method, params, result):
+        if result is None:
+            return False
+        if method in ('decoderawtransaction', 'decodescript'):
+            return True
+        if method == 'getblockhash':
+            height = self.currentHeight()
+            return height is not None and params[0] <= height - self.confirmations
+        if isinstance(result, str):
+            return True
+        return result.get('confirmations', 0) >= self.confirmations
+
+    def admit(self, key, method, params, result, body):
+        """
+        Caches the response body of a call if its result can no longer change.
+        """
+        if self.isImmutable(method, params, result):
+            self.store.put(key, bytes(body))
+
+    def stats(self):
+        return self.store.stats()
+
+
+# Seconds the answers of volatile calls are served from memory when the tip cache is enabled
+DEFAULT_TTLS = {
+    'getblockcount': 5,
+    'getblockchaininfo': 5,
+    'getconnectioncount': 5,
+    'getdifficulty': 10,
+    'getinfo': 2,
+    'getmininginfo': 5,
+    'getnettotals': 2
+}
+
+
+class TipCache:
+    """
+    Serves the answers of volatile, frequently polled calls such as *getblockcount* or *getinfo*
+    from memory for a short time to live per method.
+
+    Before a cached answer is used the best block hash is checked with a cheap *getbestblockhash*
+    call, at most once every *probeInterval* seconds, and every cached answer is dropped as soon
+    as a new tip shows up. Concurrent callers share the probe, so hundreds of identical calls per
+    second turn into a handful of calls to the server.
+    ___
+    ## Args:
+
+    * **bestBlockHash**: A function returning the current best block hash of the node
+
+    * **ttls**: (optional) A dict of method names to seconds their answers are kept, defaults to *DEFAULT_TTLS*
+
+    * **probeInterval**: (optional) Seconds between best block hash checks
+    """
+
+    def __init__(self, bestBlockHash, ttls=None, probeInterval=1):
+        self.bestBlockHash = bestBlockHash
+        self.ttls = {method: ttl for method, ttl in (ttls or DEFAULT_TTLS).items() if method != 'getbestblockhash'}
+        self.probeInterval = probeInterval
+        self.entries = {}
+        self.tip = None
+        self.probedAt = None
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.lock = threading.Lock()
+        self.probeLock = threading.Lock()
+
+    def checkTip(self):
+        with self.probeLock:
+            now = time.monotonic()
+            if self.probedAt is not None and now - self.probedAt < self.probeInterval:
+                return
+            tip = self.bestBlockHash()
+            self.probedAt = time.monotonic()
+            if tip != self.tip:
+                with self.lock:
+                    if self.entries:
+                        self.invalidations += 1
+                    self.entries.clear()
+                self.tip = tip
+
+    def lookup(self, method, params):
+        """
+        ## Returns:
+
+        * A tuple of the cache key of the call, None when the call is never cached,
+        and the cached response body, None on a miss
+        """
+        ttl = self.ttls.get(method)
+        if ttl is None or params:
+            return None, None
+        self.checkTip()
+        with self.lock:
+            entry = self.entries.get(method)
+            if entry is not None and time.monotonic() - entry[1] <= ttl:
+                self.hits += 1
+                return method, entry[0]
+            self.misses += 1
+        return method, None
+
+    def admit(self, key, method, params, result, body):
+        if result is not None:
+            with self.lock:
+                self.entries[key] = (bytes(body), time.monotonic())
+
+    def stats(self):
+        """
+        ## Returns:
+
+        * A dict with the hits, misses, tip invalidations and entries of the cache
+        """
+        with self.lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'invalidations': self.invalidations,
+                'entries': len(self.entries)
+            }
@@ -0,0 +1,94 @@
+import asyncio
+import threading
+from concurrent.futures import Future
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent identical calls, so only the first caller does the work and every caller
+    that arrives while it is in flight shares its result or exception.
+    """
+
+    def __init__(self):
+        self.inFlight = {}
+        self.calls = 0
+        self.deduplicated = 0
+        self.lock = threading.Lock()
+
+    def do(self, key, function):
+        """
+        Calls *function*, unless a call with the same *key* is already in flight, in which case its outcome is shared.
+        ___
+        ## Args:
+
+        * **key**: A hashable identifying identical calls
+
+        * **function**: A function without arguments doing the call
+
+        ## Returns:
+
+        * The result of the call
+        """
+        with self.lock:
+            self.calls += 1
+            future = self.inFlight.get(key)
+            leader = future is None
+            if leader:
+                future = self.inFlight[key] = Future()
+            else:
+                self.deduplicated += 1
+        if not leader:
+            return future.result()
+        try:
+            result = function()
+        except BaseException as error:
+            future.set_exception(error)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self.lock:
+                del self.inFlight[key]
+
+    def stats(self):
+        """
+        ## Returns:
+
+        * A dict with the number of calls, the number of calls that shared another call's outcome and the calls in flight
+        """
+        with self.lock:
+            return {'calls': self.calls, 'deduplicated': self.deduplicated, 'inFlight': len(self.inFlight)}
+
+
+class AsyncSingleFlight(SingleFlight):
+    """
+    A *SingleFlight* for coroutines running on one event loop.
+    If the caller doing the work is cancelled the callers sharing it are cancelled as well.
+    """
+
+    async def do(self, key, function):
+        """
+        Awaits *function()*, unless a call with the same *key* is already in flight, in which case its outcome is shared.
+        """
+        self.calls += 1
+        future = self.inFlight.get(key)
+        if future is not None:
+            self.deduplicated += 1
+            return await asyncio.shield(future)
+        future = self.inFlight[key] = asyncio.get_running_loop().create_future()
+        try:
+            result = await function()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as error:
+            future.set_exception(error)
+            # Retrieve the exception so an outcome nobody shared is not reported as never retrieved
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            del self.inFlight[key]
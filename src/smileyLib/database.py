@@ -0,0 +1,46 @@
+import sqlite3
+import threading
+
+
+class LocalConnections:
+    """
+    Hands out one connection per thread to an SQLite database in WAL mode, sqlite3 connections
+    must not be shared between threads. Calling it returns the connection of the calling thread,
+    opening it on first use.
+    ```
+    self.connection = LocalConnections(path, rows=True)
+    self.connection().execute('SELECT ...')
+    ```
+    ___
+    ## Args:
+
+    * **path**: The path of the database file, created if it does not exist
+
+    * **autocommit**: (optional) If true transactions are only started explicitly, e.g. with BEGIN IMMEDIATE
+
+    * **rows**: (optional) If true rows are returned as *sqlite3.Row*
+
+    * **pragmas**: (optional) Further pragmas run on every new connection before WAL mode is turned on
+    """
+
+    def __init__(self, path, autocommit=False, rows=False, pragmas=()):
+        self.path = path
+        self.autocommit = autocommit
+        self.rows = rows
+        self.pragmas = pragmas
+        self.local = threading.local()
+
+    def __call__(self):
+        connection = getattr(self.local, 'connection', None)
+        if connection is None:
+            if self.autocommit:
+                connection = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            else:
+                connection = sqlite3.connect(self.path, timeout=30)
+            if self.rows:
+                connection.row_factory = sqlite3.Row
+            for pragma in self.pragmas:
+                connection.execute(f'PRAGMA {pragma}')
+            connection.execute('PRAGMA journal_mode = WAL')
+            self.local.connection = connection
+        return connection
@@ -0,0 +1,431 @@
+from struct import error as StructError, unpack_from
+
+from .addresses import PUBKEY_ADDRESS, SCRIPT_ADDRESS, doubleSha256, hash160, hashToAddress
+from .amounts import fromSatoshi
+
+OP_PUSHDATA1, OP_PUSHDATA2, OP_PUSHDATA4 = 0x4c, 0x4d, 0x4e
+OP_1NEGATE, OP_RESERVED, OP_1, OP_16 = 0x4f, 0x50, 0x51, 0x60
+OP_DUP, OP_EQUAL, OP_EQUALVERIFY, OP_RETURN = 0x76, 0x87, 0x88, 0x6a
+OP_HASH160, OP_CHECKSIG, OP_CHECKMULTISIG = 0xa9, 0xac, 0xae
+
+OPCODE_NAMES = dict(enumerate((
+    'NOP VER IF NOTIF VERIF VERNOTIF ELSE ENDIF VERIFY RETURN TOALTSTACK FROMALTSTACK 2DROP 2DUP 3DUP 2OVER '
+    '2ROT 2SWAP IFDUP DEPTH DROP DUP NIP OVER PICK ROLL ROT SWAP TUCK CAT SUBSTR LEFT RIGHT SIZE INVERT AND '
+    'OR XOR EQUAL EQUALVERIFY RESERVED1 RESERVED2 1ADD 1SUB 2MUL 2DIV NEGATE ABS NOT 0NOTEQUAL ADD SUB MUL '
+    'DIV MOD LSHIFT RSHIFT BOOLAND BOOLOR NUMEQUAL NUMEQUALVERIFY NUMNOTEQUAL LESSTHAN GREATERTHAN '
+    'LESSTHANOREQUAL GREATERTHANOREQUAL MIN MAX WITHIN RIPEMD160 SHA1 SHA256 HASH160 HASH256 CODESEPARATOR '
+    'CHECKSIG CHECKSIGVERIFY CHECKMULTISIG CHECKMULTISIGVERIFY NOP1 NOP2 NOP3 NOP4 NOP5 NOP6 NOP7 NOP8 NOP9 NOP10'
+).split(), start=0x61))
+OPCODE_NAMES[OP_RESERVED] = 'RESERVED'
+
+# Blocks with this version bit set carry merged mining proof of work after the header
+AUXPOW_FLAG = 1 << 8
+NULL_HASH = bytes(32)
+
+
+def readVarInt(view, position):
+    first = view[position]
+    if first < 0xfd:
+        return first, position + 1
+    if first == 0xfd:
+        return unpack_from('<H', view, position + 1)[0], position + 3
+    if first == 0xfe:
+        return unpack_from('<I', view, position + 1)[0], position + 5
+    return unpack_from('<Q', view, position + 1)[0], position + 9
+
+
+def hashHex(digest):
+    return bytes(digest[::-1]).hex()
+
+
+def scriptOps(script):
+    """
+    Splits a script into (opcode, pushed data) tuples, the data is None for opcodes that push nothing.
+    Raises ValueError if a push runs past the end of the script.
+    """
+    position, end = 0, len(script)
+    while position < end:
+        opcode = script[position]
+        position += 1
+        if opcode > OP_PUSHDATA4:
+            yield opcode, None
+            continue
+        if opcode < OP_PUSHDATA1:
+            size = opcode
+        elif opcode == OP_PUSHDATA1:
+            size, position = script[position], position + 1
+        elif opcode == OP_PUSHDATA2:
+            size, position = unpack_from('<H', script, position)[0], position + 2
+        else:
+            size, position = unpack_from('<I', script, position)[0], position + 4
+        if position + size > end:
+            raise ValueError('Script push runs past its end')
+        yield opcode, script[position:position + size]
+        position += size
+
+
+def scriptAsm(script):
+    """
+    Returns the script in the human readable form used by the rpc output.
+    """
+    parts = []
+    try:
+        for opcode, data in scriptOps(script):
+            if data is not None:
+                # Short pushes are shown as numbers, like smileycoind does
+                if len(data) <= 4:
+                    number = int.from_bytes(data, 'little')
+                    if data and data[-1] & 0x80:
+                        number = -(number & ~(0x80 << 8 * (len(data) - 1)))
+                    parts.append(str(number))
+                else:
+                    parts.append(data.hex())
+            elif opcode == OP_1NEGATE:
+                parts.append('-1')
+            elif OP_1 <= opcode <= OP_16:
+                parts.append(str(opcode - OP_1 + 1))
+            else:
+                parts.append('OP_' + OPCODE_NAMES.get(opcode, 'UNKNOWN'))
+    except (ValueError, IndexError):
+        parts.append('[error]')
+    return ' '.join(parts)
+
+
+SCRIPT_TYPES = ('nonstandard', 'pubkeyhash', 'scripthash', 'pubkey', 'multisig', 'nulldata')
+
+
+def scriptType(script):
+    """
+    Classifies an output script by its byte pattern alone, faster than *scriptPubKey* when only
+    the type and the hash paid to are needed.
+    ___
+    ## Returns:
+
+    * A tuple of the type, one of *SCRIPT_TYPES*, and the 20 byte hash paid to, empty for types without one
+    """
+    size = len(script)
+    if size == 25 and script[0] == OP_DUP and script[1] == OP_HASH160 and script[2] == 20 \
+            and script[23] == OP_EQUALVERIFY and script[24] == OP_CHECKSIG:
+        return 'pubkeyhash', script[3:23]
+    if size == 23 and script[0] == OP_HASH160 and script[1] == 20 and script[22] == OP_EQUAL:
+        return 'scripthash', script[2:22]
+    if size in (35, 67) and script[0] == size - 2 and script[-1] == OP_CHECKSIG:
+        try:
+            return 'pubkey', hash160(script[1:-1])
+        except ValueError:
+            return 'pubkey', b''
+    if size and script[0] == OP_RETURN:
+        return 'nulldata', b''
+    if size and script[-1] == OP_CHECKMULTISIG:
+        return scriptPubKey(script)['type'], b''
+    return 'nonstandard', b''
+
+
+def scriptPubKey(script, pubkeyVersion=PUBKEY_ADDRESS, scriptVersion=SCRIPT_ADDRESS):
+    """
+    Returns the *scriptPubKey* object of the rpc output for an output script.
+    """
+    result = {'asm': scriptAsm(script), 'hex': script.hex()}
+    try:
+        ops = list(scriptOps(script))
+    except (ValueError, IndexError):
+        ops = []
+    opcodes = [opcode for opcode, _ in ops]
+    sizes = [None if data is None else len(data) for _, data in ops]
+    if opcodes[:2] == [OP_DUP, OP_HASH160] and opcodes[3:] == [OP_EQUALVERIFY, OP_CHECKSIG] and sizes[2:3] == [20]:
+        result.update(reqSigs=1, type='pubkeyhash', addresses=[hashToAddress(ops[2][1], pubkeyVersion)])
+    elif len(ops) == 3 and opcodes[0] == OP_HASH160 and opcodes[2] == OP_EQUAL and sizes[1] == 20:
+        result.update(reqSigs=1, type='scripthash', addresses=[hashToAddress(ops[1][1], scriptVersion)])
+    elif len(ops) == 2 and opcodes[1] == OP_CHECKSIG and sizes[0] in (33, 65):
+        result.update(reqSigs=1, type='pubkey')
+        try:
+            result['addresses'] = [hashToAddress(hash160(ops[0][1]), pubkeyVersion)]
+        except ValueError:
+            # hashlib built without ripemd160
+            pass
+    elif (len(ops) >= 4 and opcodes[-1] == OP_CHECKMULTISIG and OP_1 <= opcodes[0] <= OP_16
+          and OP_1 <= opcodes[-2] <= OP_16 and opcodes[-2] - OP_1 + 1 == len(ops) - 3
+          and all(size in (33, 65) for size in sizes[1:-2])):
+        result.update(reqSigs=opcodes[0] - OP_1 + 1, type='multisig')
+        try:
+            result['addresses'] = [hashToAddress(hash160(data), pubkeyVersion) for _, data in ops[1:-2]]
+        except ValueError:
+            pass
+    elif script[:1] == bytes([OP_RETURN]):
+        result['type'] = 'nulldata'
+    else:
+        result['type'] = 'nonstandard'
+    return result
+
+
+class Transaction:
+    """
+    A serialized transaction decoded in place from bytes or a memoryview, without copying it.
+
+    Only the positions of the inputs and outputs are found when the transaction is created,
+    they are decoded into the objects of the rpc output the first time they are accessed.
+    Fields can be read as attributes or by key, `transaction['vout']`, like the *decoderawtransaction* result.
+    ```
+    transaction = Transaction(bytes.fromhex(smileyObject.getrawtransaction(txid)))
+    transaction.txid, transaction.vout[0]['value']
+    ```
+    ___
+    ## Args:
+
+    * **data**: The serialized transaction, or a buffer it is part of
+
+    * **offset**: (optional) The position of the transaction in *data*
+    """
+
+    FIELDS = ('txid', 'version', 'locktime', 'vin', 'vout')
+
+    def __init__(self, data, offset=0):
+        view = memoryview(data)
+        self.view = view
+        self.offset = offset
+        try:
+            self.parse(view, offset)
+        except (StructError, IndexError):
+            raise ValueError('Transaction runs past the end of the data') from None
+        self._txid = self._vin = self._vout = None
+
+    def parse(self, view, offset):
+        self.version = unpack_from('<i', view, offset)[0]
+        self.inputCount, position = readVarInt(view, offset + 4)
+        if self.inputCount == 0:
+            raise ValueError('Transactions without inputs or with witness data are not supported')
+        self.inputsStart = position
+        for _ in range(self.inputCount):
+            size, position = readVarInt(view, position + 36)
+            position += size + 4
+        self.outputCount, position = readVarInt(view, position)
+        self.outputsStart = position
+        for _ in range(self.outputCount):
+            size, position = readVarInt(view, position + 8)
+            position += size
+        self.locktime = unpack_from('<I', view, position)[0]
+        self.end = position + 4
+
+    def __getitem__(self, name):
+        if name not in self.FIELDS:
+            raise KeyError(name)
+        return getattr(self, name)
+
+    @property
+    def raw(self):
+        """
+        A memoryview of the serialized transaction.
+        """
+        return self.view[self.offset:self.end]
+
+    @property
+    def size(self):
+        return self.end - self.offset
+
+    @property
+    def txid(self):
+        if self._txid is None:
+            self._txid = hashHex(doubleSha256(self.raw))
+        return self._txid
+
+    def inputs(self):
+        """
+        Walks the inputs without building their rpc objects.
+        ___
+        ## Returns:
+
+        * A generator of (previous txid as bytes, previous output index, script memoryview, sequence) tuples
+        """
+        view, position = self.view, self.inputsStart
+        for _ in range(self.inputCount):
+            previous = view[position:position + 32]
+            index = unpack_from('<I', view, position + 32)[0]
+            size, position = readVarInt(view, position + 36)
+            script = view[position:position + size]
+            position += size
+            yield previous, index, script, unpack_from('<I', view, position)[0]
+            position += 4
+
+    def outputs(self):
+        """
+        Walks the outputs without building their rpc objects.
+        ___
+        ## Returns:
+
+        * A generator of (index, value in satoshis, script memoryview) tuples
+        """
+        view, position = self.view, self.outputsStart
+        for index in range(self.outputCount):
+            value = unpack_from('<q', view, position)[0]
+            size, position = readVarInt(view, position + 8)
+            yield index, value, view[position:position + size]
+            position += size
+
+    @property
+    def isCoinbase(self):
+        previous, index, _, _ = next(self.inputs())
+        return self.inputCount == 1 and index == 0xffffffff and previous == NULL_HASH
+
+    @property
+    def vin(self):
+        if self._vin is None:
+            coinbase = self.isCoinbase
+            self._vin = []
+            for previous, index, script, sequence in self.inputs():
+                if coinbase:
+                    self._vin.append({'coinbase': script.hex(), 'sequence': sequence})
+                else:
+                    self._vin.append({
+                        'txid': hashHex(previous),
+                        'vout': index,
+                        'scriptSig': {'asm': scriptAsm(script), 'hex': script.hex()},
+                        'sequence': sequence
+                    })
+        return self._vin
+
+    @property
+    def vout(self):
+        if self._vout is None:
+            self._vout = [
+                {'value': fromSatoshi(value), 'n': index, 'scriptPubKey': scriptPubKey(script)}
+                for index, value, script in self.outputs()
+            ]
+        return self._vout
+
+    def toDict(self):
+        """
+        ## Returns:
+
+        * The transaction as the object returned by *decoderawtransaction*
+        """
+        return {name: getattr(self, name) for name in self.FIELDS}
+
+
+class Block:
+    """
+    A serialized block decoded in place from bytes or a memoryview, without copying it.
+
+    The header is decoded when the block is created, the transactions are found and decoded
+    the first time they are accessed. Fields can be read as attributes or by key like the
+    *getblock* result, apart from the fields that depend on the rest of the chain such as
+    height, confirmations and nextblockhash.
+    ```
+    block = Block(bytes.fromhex(smileyObject.getblock(hash, False)))
+    for transaction in block:
+        ...
+    ```
+    ___
+    ## Args:
+
+    * **data**: The serialized block
+    """
+
+    FIELDS = ('hash', 'size', 'version', 'merkleroot', 'tx', 'time', 'nonce', 'bits', 'difficulty',
+              'previousblockhash')
+
+    def __init__(self, data):
+        view = memoryview(data)
+        self.view = view
+        self.version, self.time, self.bitsValue, self.nonce = (
+            unpack_from('<i', view, 0)[0], *unpack_from('<III', view, 68))
+        position = 80
+        if self.version & AUXPOW_FLAG:
+            position = self.skipAuxPow(position)
+        self.transactionCount, self.transactionsStart = readVarInt(view, position)
+        self._hash = self._transactions = None
+
+    def skipAuxPow(self, position):
+        position = Transaction(self.view, position).end + 32
+        for _ in range(2):
+            count, position = readVarInt(self.view, position)
+            position += 32 * count + 4
+        return position + 80
+
+    def __getitem__(self, name):
+        if name not in self.FIELDS:
+            raise KeyError(name)
+        return getattr(self, name)
+
+    def __iter__(self):
+        return iter(self.transactions)
+
+    def __len__(self):
+        return self.transactionCount
+
+    @property
+    def size(self):
+        return len(self.view)
+
+    @property
+    def hash(self):
+        if self._hash is None:
+            self._hash = hashHex(doubleSha256(self.view[:80]))
+        return self._hash
+
+    @property
+    def previousblockhash(self):
+        previous = self.view[4:36]
+        return None if previous == NULL_HASH else hashHex(previous)
+
+    @property
+    def merkleroot(self):
+        return hashHex(self.view[36:68])
+
+    @property
+    def bits(self):
+        return f'{self.bitsValue:08x}'
+
+    @property
+    def difficulty(self):
+        shift = (self.bitsValue >> 24) & 0xff
+        difficulty = 0x0000ffff / (self.bitsValue & 0x00ffffff)
+        while shift < 29:
+            difficulty *= 256.0
+            shift += 1
+        while shift > 29:
+            difficulty /= 256.0
+            shift -= 1
+        return difficulty
+
+    @property
+    def transactions(self):
+        """
+        The transactions of the block as lazily decoded *Transaction* objects.
+        """
+        if self._transactions is None:
+            transactions, position = [], self.transactionsStart
+            for _ in range(self.transactionCount):
+                transaction = Transaction(self.view, position)
+                transactions.append(transaction)
+                position = transaction.end
+            self._transactions = transactions
+        return self._transactions
+
+    @property
+    def tx(self):
+        return [transaction.txid for transaction in self.transactions]
+
+    def toDict(self):
+        """
+        ## Returns:
+
+        * The block as the object returned by *getblock*, without the fields that depend on the rest of the chain
+        """
+        result = {name: getattr(self, name) for name in self.FIELDS}
+        if result['previousblockhash'] is None:
+            del result['previousblockhash']
+        return result
+
+
+def decodeTransaction(data):
+    """
+    Decodes a serialized transaction given as bytes, a memoryview or a hex string.
+    """
+    return Transaction(bytes.fromhex(data) if isinstance(data, str) else data)
+
+
+def decodeBlock(data):
+    """
+    Decodes a serialized block given as bytes, a memoryview or a hex string.
+    """
+    return Block(bytes.fromhex(data) if isinstance(data, str) else data)
@@ -0,0 +1,164 @@
+import sqlite3
+import threading
+import time
+
+from .database import LocalConnections
+
+
+class SQLiteCache:
+    """
+    A persistent cache store in an SQLite database, so cached chain data survives restarts.
+
+    The database runs in WAL mode, so several processes can read and write the same cache file
+    at the same time, and reads go through SQLite's memory mapped io. When the stored values grow
+    beyond *maxBytes* the least recently used entries are deleted and the freed pages returned to the
+    file system. Has the same interface as *LRUCache* and can be used as the store of a *ChainCache*.
+    ___
+    ## Args:
+
+    * **path**: The path of the database file, created if it does not exist
+
+    * **maxBytes**: (optional) The number of value bytes the database may hold before entries are evicted
+
+    * **mmapSize**: (optional) The number of bytes of the database file read through memory mapping
+    """
+
+    # Entries are only marked as used again after this many seconds, so reads rarely write
+    TOUCH_INTERVAL = 60
+
+    def __init__(self, path, maxBytes=1 << 30, mmapSize=1 << 28):
+        self.path = path
+        self.maxBytes = maxBytes
+        self.mmapSize = mmapSize
+        self.connection = LocalConnections(
+            path, autocommit=True,
+            pragmas=('auto_vacuum = INCREMENTAL', 'synchronous = NORMAL', f'mmap_size = {int(mmapSize)}')
+        )
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        connection = self.connection()
+        with connection:
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS entries '
+                '(key TEXT PRIMARY KEY, value BLOB NOT NULL, size INTEGER NOT NULL, accessed REAL NOT NULL)'
+            )
+            connection.execute('CREATE INDEX IF NOT EXISTS entriesAccessed ON entries (accessed)')
+        self.bytes = connection.execute('SELECT COALESCE(SUM(size), 0) FROM entries').fetchone()[0]
+
+    def get(self, key):
+        connection = self.connection()
+        row = connection.execute('SELECT value, accessed FROM entries WHERE key = ?', (key,)).fetchone()
+        with self.lock:
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        now = time.time()
+        if now - row[1] > self.TOUCH_INTERVAL:
+            connection.execute('UPDATE entries SET accessed = ? WHERE key = ?', (now, key))
+        return bytes(row[0])
+
+    def put(self, key, value):
+        if len(value) > self.maxBytes:
+            return
+        connection = self.connection()
+        connection.execute(
+            'INSERT OR REPLACE INTO entries (key, value, size, accessed) VALUES (?, ?, ?, ?)',
+            (key, sqlite3.Binary(value), len(value), time.time())
+        )
+        with self.lock:
+            self.bytes += len(value)
+            full = self.bytes > self.maxBytes
+        if full:
+            self.compact()
+
+    def compact(self):
+        """
+        Deletes the least recently used entries until the cache holds at most 90% of *maxBytes*,
+        and returns the freed pages to the file system.
+        """
+        connection = self.connection()
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            total = connection.execute('SELECT COALESCE(SUM(size), 0) FROM entries').fetchone()[0]
+            target = self.maxBytes * 0.9
+            evicted = 0
+            if total > target:
+                rows = connection.execute('SELECT key, size FROM entries ORDER BY accessed').fetchall()
+                keys = []
+                for key, size in rows:
+                    if total <= target:
+                        break
+                    keys.append((key,))
+                    total -= size
+                connection.executemany('DELETE FROM entries WHERE key = ?', keys)
+                evicted = len(keys)
+            connection.execute('COMMIT')
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+        connection.execute('PRAGMA incremental_vacuum')
+        with self.lock:
+            self.bytes = total
+            self.evictions += evicted
+
+    def clear(self):
+        connection = self.connection()
+        connection.execute('DELETE FROM entries')
+        connection.execute('PRAGMA incremental_vacuum')
+        with self.lock:
+            self.bytes = 0
+
+    def stats(self):
+        """
+        ## Returns:
+
+        * A dict with the hits, misses and evictions of this process and the entries and bytes of the database
+        """
+        entries, size = self.connection().execute('SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries').fetchone()
+        with self.lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'entries': entries,
+                'bytes': size
+            }
+
+
+class TieredCache:
+    """
+    Puts a fast cache in front of a slower one, e.g. an *LRUCache* in front of an *SQLiteCache*.
+    Hits in the slower cache are copied into the faster one.
+    ___
+    ## Args:
+
+    * **first**: The cache asked first
+
+    * **second**: The cache asked on a miss in the first one
+    """
+
+    def __init__(self, first, second):
+        self.first = first
+        self.second = second
+
+    def get(self, key):
+        value = self.first.get(key)
+        if value is None:
+            value = self.second.get(key)
+            if value is not None:
+                self.first.put(key, value)
+        return value
+
+    def put(self, key, value):
+        self.first.put(key, value)
+        self.second.put(key, value)
+
+    def clear(self):
+        self.first.clear()
+        self.second.clear()
+
+    def stats(self):
+        return {'memory': self.first.stats(), 'disk': self.second.stats()}
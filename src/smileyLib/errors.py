@@ -0,0 +1,44 @@
+class RPCError(Exception):
+    """
+    Raised when smileycoind answers a call with a json rpc error object.
+    ___
+    ## Args:
+
+    * **method**: The rpc method that failed
+
+    * **code**: The error code returned by the server
+
+    * **message**: The error message returned by the server
+    """
+
+    def __init__(self, method, code, message):
+        super().__init__(f'{method} failed with error {code}: {message}')
+        self.method = method
+        self.code = code
+        self.message = message
+
+
+class CircuitOpenError(Exception):
+    """
+    Raised instead of calling the server while the circuit breaker considers it unhealthy.
+    """
+
+
+class DeadlineExceeded(TimeoutError):
+    """
+    Raised when a call is made after the deadline set with *smiley.deadline* has passed.
+    """
+
+
+class ChainReorganized(Exception):
+    """
+    Raised when a block that was already handed out is no longer part of the best chain.
+    ___
+    ## Args:
+
+    * **height**: The height of the first block that was replaced
+    """
+
+    def __init__(self, height):
+        super().__init__(f'The chain was reorganized at height {height}')
+        self.height = height
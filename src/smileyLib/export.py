@@ -0,0 +1,215 @@
+import json
+import os
+import sys
+from array import array
+
+from .blocks import iterBlocks
+from .decoder import SCRIPT_TYPES, Block, scriptType
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# Columns are either an array typecode or the width of a fixed size bytes column.
+# Hashes are stored in the byte order they are shown in by the rpc calls.
+SCHEMA = {
+    'blocks': (
+        ('height', 'i'), ('hash', 32), ('time', 'I'), ('size', 'I'), ('version', 'i'), ('bits', 'I'),
+        ('nonce', 'I'), ('transactions', 'I')
+    ),
+    'transactions': (
+        ('height', 'i'), ('index', 'I'), ('txid', 32), ('size', 'I'), ('version', 'i'), ('locktime', 'I'),
+        ('inputs', 'I'), ('outputs', 'I')
+    ),
+    'inputs': (
+        ('transaction', 'q'), ('index', 'I'), ('previousTxid', 32), ('previousVout', 'I'), ('sequence', 'I')
+    ),
+    'outputs': (
+        ('transaction', 'q'), ('index', 'I'), ('value', 'q'), ('type', 'B'), ('hash', 20)
+    )
+}
+SCRIPT_TYPE_CODES = {name: code for code, name in enumerate(SCRIPT_TYPES)}
+NULL_HASH = bytes(20)
+
+
+class ColumnTable:
+    """
+    A table stored as one file of fixed width values per column, appended to in place.
+    Values are buffered in typed arrays and written out on *flush*.
+    """
+
+    def __init__(self, directory, name, columns):
+        self.name = name
+        self.columns = columns
+        self.paths = [os.path.join(directory, f'{name}.{column}.bin') for column, _ in columns]
+        self.buffers = [bytearray() if isinstance(kind, int) else array(kind) for _, kind in columns]
+
+    def widths(self):
+        return [kind if isinstance(kind, int) else array(kind).itemsize for _, kind in self.columns]
+
+    def append(self, *row):
+        for buffer, value in zip(self.buffers, row):
+            if isinstance(buffer, bytearray):
+                buffer += value
+            else:
+                buffer.append(value)
+
+    def flush(self):
+        for path, buffer in zip(self.paths, self.buffers):
+            with open(path, 'ab') as file:
+                if isinstance(buffer, bytearray):
+                    file.write(buffer)
+                    del buffer[:]
+                else:
+                    buffer.tofile(file)
+                    del buffer[:]
+
+    def truncate(self, rows):
+        """
+        Cuts every column file to *rows* values, dropping anything written after the last complete flush.
+        """
+        for path, width in zip(self.paths, self.widths()):
+            with open(path, 'ab') as file:
+                file.truncate(rows * width)
+
+
+def readMeta(directory):
+    try:
+        with open(os.path.join(directory, 'meta.json')) as file:
+            return json.load(file)
+    except FileNotFoundError:
+        return None
+
+
+def writeMeta(directory, meta):
+    path = os.path.join(directory, 'meta.json')
+    with open(path + '.tmp', 'w') as file:
+        json.dump(meta, file)
+    os.replace(path + '.tmp', path)
+
+
+def exportColumns(client, directory, start=0, end=None, confirmations=6, flushEvery=1000, batchSize=50,
+                  concurrency=4):
+    """
+    Exports blocks, transactions, inputs and outputs into typed column files for analytics.
+
+    Blocks are fetched serialized with *iterBlocks* and decoded locally, no per transaction objects are
+    built. Amounts are stored as integer satoshis. Every column is a file of fixed width values in the byte order
+    of the exporting machine and can be memory mapped, see *loadColumns*. Rows of inputs and outputs refer to their
+    transaction by its row number in the transactions table.
+
+    The files are appended to after every *flushEvery* blocks, an export that is stopped continues after
+    the last flushed block when it is run again with the same directory.
+    ___
+    ## Args:
+
+    * **client**: The smiley client to fetch the blocks with
+
+    * **directory**: The directory the column files are written to
+
+    * **start**: (optional) The height of the first block, ignored when continuing an earlier export
+
+    * **end**: (optional) The height of the last block, defaults to the last block with *confirmations* confirmations
+
+    * **confirmations**: (optional) The confirmations the last block needs when *end* is not given, so reorgs do not change exported blocks
+
+    * **flushEvery**: (optional) The number of blocks between writes to disk
+
+    * **batchSize**: (optional) The number of blocks fetched per batch request
+
+    * **concurrency**: (optional) The number of batches fetched at the same time
+
+    ## Returns:
+
+    * A dict of the number of rows in each table
+    """
+    os.makedirs(directory, exist_ok=True)
+    tables = {name: ColumnTable(directory, name, columns) for name, columns in SCHEMA.items()}
+    meta = readMeta(directory)
+    if meta is None:
+        meta = {'byteorder': sys.byteorder, 'height': start - 1, 'rows': {name: 0 for name in SCHEMA},
+                'widths': {name: table.widths() for name, table in tables.items()}}
+    for name, table in tables.items():
+        table.truncate(meta['rows'][name])
+    rows = dict(meta['rows'])
+    if end is None:
+        end = client.getblockcount() - confirmations + 1
+
+    def flush(height):
+        for table in tables.values():
+            table.flush()
+        meta['height'] = height
+        meta['rows'] = dict(rows)
+        writeMeta(directory, meta)
+
+    blocks, transactions, inputs, outputs = (tables[name] for name in ('blocks', 'transactions', 'inputs', 'outputs'))
+    height = meta['height']
+    for height, blockHash, raw in iterBlocks(client, meta['height'] + 1, end, batchSize, concurrency, False):
+        block = Block(bytes.fromhex(raw))
+        blocks.append(height, bytes.fromhex(blockHash), block.time, block.size, block.version, block.bitsValue,
+                      block.nonce, block.transactionCount)
+        for index, transaction in enumerate(block.transactions):
+            row = rows['transactions']
+            transactions.append(height, index, bytes.fromhex(transaction.txid), transaction.size,
+                                transaction.version, transaction.locktime, transaction.inputCount,
+                                transaction.outputCount)
+            for number, (previous, vout, _, sequence) in enumerate(transaction.inputs()):
+                inputs.append(row, number, bytes(previous)[::-1], vout, sequence)
+            for number, value, script in transaction.outputs():
+                kind, paidTo = scriptType(script)
+                outputs.append(row, number, value, SCRIPT_TYPE_CODES[kind], paidTo or NULL_HASH)
+            rows['transactions'] += 1
+            rows['inputs'] += transaction.inputCount
+            rows['outputs'] += transaction.outputCount
+        rows['blocks'] += 1
+        if rows['blocks'] % flushEvery == 0:
+            flush(height)
+    flush(height)
+    return rows
+
+
+def loadColumns(directory, table):
+    """
+    Loads the columns of an exported table.
+    With numpy installed columns are read only memory maps, fixed size bytes columns have one row of bytes
+    per value. Without numpy columns are read into typed arrays and bytes columns into lists of bytes.
+    ___
+    ## Args:
+
+    * **directory**: The directory of the export
+
+    * **table**: One of blocks, transactions, inputs and outputs
+
+    ## Returns:
+
+    * A dict from column name to its values
+    """
+    meta = readMeta(directory)
+    if meta is None:
+        raise FileNotFoundError(f'No export found in {directory}')
+    rows = meta['rows'][table]
+    endian = '<' if meta['byteorder'] == 'little' else '>'
+    columns = {}
+    for (column, kind), width in zip(SCHEMA[table], meta['widths'][table]):
+        path = os.path.join(directory, f'{table}.{column}.bin')
+        if numpy is not None:
+            if isinstance(kind, int):
+                dtype, shape = numpy.uint8, (rows, kind)
+            else:
+                dtype = numpy.dtype(f'{endian}{"u" if kind.isupper() else "i"}{width}')
+                shape = (rows,)
+            columns[column] = numpy.memmap(path, dtype=dtype, mode='r', shape=shape) if rows else \
+                numpy.zeros(shape, dtype)
+        else:
+            with open(path, 'rb') as file:
+                data = file.read(rows * width)
+            if isinstance(kind, int):
+                columns[column] = [data[offset:offset + kind] for offset in range(0, len(data), kind)]
+            else:
+                values = array(kind)
+                values.frombytes(data)
+                if meta['byteorder'] != sys.byteorder:
+                    values.byteswap()
+                columns[column] = values
+    return columns
@@ -0,0 +1,59 @@
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+
+def fanOut(function, argumentIterable, concurrency=8, ordered=True, returnExceptions=False):
+    """
+    Calls *function* once for every argument tuple over a thread pool, keeping at most
+    *concurrency* calls in flight. The input is consumed lazily so memory stays flat
+    for arbitrarily long inputs.
+    ___
+    ## Args:
+
+    * **function**: The function to call
+
+    * **argumentIterable**: An iterable of argument tuples, other values are passed as a single argument
+
+    * **concurrency**: (optional) The maximum number of calls running at the same time
+
+    * **ordered**: (optional) If true results are yielded in input order, otherwise as they complete
+
+    * **returnExceptions**: (optional) If true exceptions are yielded in place of results instead of raised
+
+    ## Returns:
+
+    * A generator of results when *ordered*, otherwise of (arguments, result) tuples
+    """
+    arguments = (args if isinstance(args, tuple) else (args,) for args in argumentIterable)
+
+    def outcome(future):
+        if returnExceptions and future.exception() is not None:
+            return future.exception()
+        return future.result()
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        pending = deque() if ordered else {}
+        try:
+            for args in arguments:
+                if len(pending) >= concurrency:
+                    if ordered:
+                        yield outcome(pending.popleft())
+                    else:
+                        done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                        for future in done:
+                            yield pending.pop(future), outcome(future)
+                future = executor.submit(function, *args)
+                if ordered:
+                    pending.append(future)
+                else:
+                    pending[future] = args
+            while pending:
+                if ordered:
+                    yield outcome(pending.popleft())
+                else:
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        yield pending.pop(future), outcome(future)
+        finally:
+            for future in pending:
+                future.cancel()
@@ -0,0 +1,160 @@
+import json
+import os
+import threading
+from collections import deque
+
+from .blocks import iterBlocks
+from .errors import ChainReorganized
+from .worker import Worker
+
+CONNECTED = 'connected'
+DISCONNECTED = 'disconnected'
+
+
+class ChainFollower(Worker):
+    """
+    Follows the tip of the best chain and tells subscribers about every block that is connected to it
+    or disconnected from it, in chain order.
+
+    One poll of *getbestblockhash* is shared by every subscriber. When the tip changed, blocks that were
+    reorganized away are disconnected newest first and the new blocks are connected oldest first, long
+    catch ups are fetched with *iterBlocks*. The hashes of the last *maxReorgDepth* connected blocks are
+    kept to find fork points and are saved to *cursor*, so a restarted follower continues where it
+    stopped, including rewinding across forks that happened while it was down.
+
+    Events are delivered at least once: a block whose event was delivered right before a crash is
+    delivered again after the restart. A subscriber that raises stops the poll before the cursor moves
+    past the block.
+    ```
+    follower = ChainFollower(smileyObject, cursor='follower.json')
+    follower.subscribe(lambda event, height, hash, block: print(event, height, hash))
+    follower.start()
+    ```
+    ___
+    ## Args:
+
+    * **client**: The smiley client to follow the chain with
+
+    * **cursor**: (optional) The path of a file the position of the follower is saved to
+
+    * **start**: (optional) The height to start at when there is no saved cursor, defaults to the current tip
+
+    * **interval**: (optional) Seconds between polls of the tip
+
+    * **maxReorgDepth**: (optional) The number of connected blocks kept to rewind across forks
+
+    * **batchSize**: (optional) The number of blocks fetched per batch request while catching up
+
+    * **concurrency**: (optional) The number of batches fetched at the same time while catching up
+    """
+
+    workName = 'poll'
+
+    def __init__(self, client, cursor=None, start=None, interval=1, maxReorgDepth=100, batchSize=50,
+                 concurrency=4):
+        super().__init__(interval)
+        self.client = client
+        self.cursor = cursor
+        self.startHeight = start
+        self.batchSize = batchSize
+        self.concurrency = concurrency
+        self.recent = deque(maxlen=maxReorgDepth)
+        self.subscribers = []
+        self.lock = threading.RLock()
+        if cursor is not None and os.path.exists(cursor):
+            with open(cursor) as file:
+                self.recent.extend(tuple(entry) for entry in json.load(file)['recent'])
+
+    @property
+    def tip(self):
+        """
+        The height and hash of the last connected block, or None before the first poll.
+        """
+        return self.recent[-1] if self.recent else None
+
+    def subscribe(self, callback):
+        """
+        Registers a callback that is called with the event, either *connected* or *disconnected*,
+        and the height, hash and block of every block.
+        ___
+        ## Returns:
+
+        * The callback, so *subscribe* can be used as a decorator
+        """
+        self.subscribers.append(callback)
+        return callback
+
+    def unsubscribe(self, callback):
+        self.subscribers.remove(callback)
+
+    def emit(self, event, height, blockHash, block):
+        for callback in list(self.subscribers):
+            callback(event, height, blockHash, block)
+
+    def save(self):
+        if self.cursor is None:
+            return
+        temporary = self.cursor + '.tmp'
+        with open(temporary, 'w') as file:
+            json.dump({'recent': list(self.recent)}, file)
+        os.replace(temporary, self.cursor)
+
+    def rewind(self, tipHeight):
+        entries = [entry for entry in self.recent if entry[0] <= tipHeight]
+        with self.client.batch() as batch:
+            futures = [batch.getblockhash(height) for height, _ in entries]
+        matches = [entry for entry, future in zip(entries, futures) if future.result() == entry[1]]
+        if not matches:
+            raise ChainReorganized(self.recent[0][0])
+        fork = matches[-1][0]
+        orphaned = [entry for entry in self.recent if entry[0] > fork]
+        with self.client.batch() as batch:
+            blocks = [batch.getblock(blockHash) for _, blockHash in orphaned]
+        for (height, blockHash), block in reversed(list(zip(orphaned, blocks))):
+            self.emit(DISCONNECTED, height, blockHash, block.result())
+            self.recent.pop()
+        return len(orphaned)
+
+    def poll(self):
+        """
+        Checks the tip once and delivers the events for every change since the last poll.
+        ___
+        ## Returns:
+
+        * The number of events delivered
+        """
+        with self.lock:
+            try:
+                return self.advance()
+            finally:
+                self.save()
+
+    def advance(self):
+        bestHash = self.client.getbestblockhash()
+        if self.recent and self.recent[-1][1] == bestHash:
+            return 0
+        tipHeight = self.client.getblockcount()
+        if not self.recent and self.startHeight is None:
+            self.recent.append((tipHeight, self.client.getblockhash(tipHeight)))
+            return 0
+        events = 0
+        if self.recent:
+            height, blockHash = self.recent[-1]
+            if height > tipHeight or self.client.getblockhash(height) != blockHash:
+                events += self.rewind(tipHeight)
+        start = self.recent[-1][0] + 1 if self.recent else self.startHeight
+        try:
+            for height, blockHash, block in iterBlocks(self.client, start, tipHeight, self.batchSize,
+                                                        self.concurrency):
+                if self.recent and block.get('previousblockhash') != self.recent[-1][1]:
+                    # The chain moved under us, the next poll rewinds to the fork
+                    break
+                self.emit(CONNECTED, height, blockHash, block)
+                self.recent.append((height, blockHash))
+                events += 1
+        except ChainReorganized:
+            pass
+        return events
+
+    def work(self):
+        self.poll()
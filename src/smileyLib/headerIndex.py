@@ -0,0 +1,240 @@
+import threading
+from array import array
+
+from .worker import Worker
+
+
+class HeaderIndex(Worker):
+    """
+    A compact in memory index of the block chain headers, answering *getblockhash*, *getbestblockhash*
+    and *getblockcount* and range lookups of block hashes without calling smileycoind.
+
+    Block hashes are stored back to back in a bytearray, 32 bytes per height, and block times in an
+    unsigned int array. *sync* extends the index from the node with batched calls and handles reorgs:
+    it walks back from the indexed tip until its hashes match the node again, drops the blocks after
+    that fork point and indexes the new branch.
+    ```
+    headers = HeaderIndex(smileyObject)
+    headers.sync()
+    headers.getblockhash(1000)
+    headers.range(1000, 5000)
+    ```
+    ___
+    ## Args:
+
+    * **client**: The smiley client to read the chain with
+
+    * **times**: (optional) If true block times are indexed too, which needs a *getblock* call per block.
+    Each block is then checked to link to the previous one, without times each chunk of hashes is checked to
+    link to the index and to be fetched while the tip did not move
+
+    * **hashIndex**: (optional) If true a dict from hash to height is kept for *height* and *header* lookups
+
+    * **batchSize**: (optional) The number of calls sent per batch request while syncing
+    """
+
+    HASH_SIZE = 32
+    workName = 'sync'
+
+    def __init__(self, client, times=True, hashIndex=True, batchSize=500):
+        super().__init__(10)
+        self.client = client
+        self.withTimes = times
+        self.batchSize = batchSize
+        self.hashes = bytearray()
+        self.times = array('I')
+        self.byHash = {} if hashIndex else None
+        self.lock = threading.RLock()
+
+    def __len__(self):
+        return len(self.hashes) // self.HASH_SIZE
+
+    def hashAt(self, height):
+        start = height * self.HASH_SIZE
+        return self.hashes[start:start + self.HASH_SIZE].hex()
+
+    def truncate(self, length):
+        if self.byHash is not None:
+            for height in range(length, len(self)):
+                self.byHash.pop(bytes.fromhex(self.hashAt(height)), None)
+        del self.hashes[length * self.HASH_SIZE:]
+        del self.times[length:]
+
+    def append(self, blockHash, time=0):
+        raw = bytes.fromhex(blockHash)
+        if self.byHash is not None:
+            self.byHash[raw] = len(self)
+        self.hashes += raw
+        if self.withTimes:
+            self.times.append(time)
+
+    def fetchHashes(self, heights):
+        with self.client.batch(self.batchSize) as batch:
+            futures = [batch.getblockhash(height) for height in heights]
+        return [future.result() for future in futures]
+
+    def fetchLinkedHashes(self, heights):
+        """
+        Fetches the hashes at *heights* without block headers to check their links with. The hashes are asked
+        for between two *getbestblockhash* calls, followed by the hash below them, and only returned when the
+        tip did not move while they were fetched and they continue the index, None otherwise.
+        """
+        with self.client.batch(self.batchSize) as batch:
+            before = batch.getbestblockhash()
+            futures = [batch.getblockhash(height) for height in heights]
+            below = batch.getblockhash(heights[0] - 1) if heights[0] else None
+            after = batch.getbestblockhash()
+        if before.result() != after.result():
+            return None
+        if below is not None and below.result() != self.hashAt(heights[0] - 1):
+            return None
+        return [future.result() for future in futures]
+
+    def findFork(self, height):
+        """
+        Returns the highest height up to *height* at which the index and the node agree, -1 if they agree nowhere.
+        """
+        window = 16
+        while height >= 0:
+            low = max(0, height - window + 1)
+            heights = list(range(height, low - 1, -1))
+            for checked, nodeHash in zip(heights, self.fetchHashes(heights)):
+                if nodeHash == self.hashAt(checked):
+                    return checked
+            height = low - 1
+            window = min(window * 2, self.batchSize)
+        return -1
+
+    def sync(self):
+        """
+        Brings the index up to the tip of the node.
+        ___
+        ## Returns:
+
+        * The number of blocks dropped by a reorg and the number of blocks added, as a tuple
+        """
+        with self.lock:
+            dropped = added = 0
+            tip = self.client.getblockcount()
+            while True:
+                if len(self):
+                    fork = self.findFork(min(len(self) - 1, tip))
+                    dropped += len(self) - fork - 1
+                    self.truncate(fork + 1)
+                if len(self) > tip:
+                    return dropped, added
+                extended = self.extend(tip)
+                added += extended
+                if len(self) > tip:
+                    return dropped, added
+                tip = self.client.getblockcount()
+
+    def extend(self, tip):
+        added = 0
+        for start in range(len(self), tip + 1, self.batchSize):
+            heights = range(start, min(start + self.batchSize, tip + 1))
+            if self.withTimes:
+                hashes = self.fetchHashes(heights)
+            else:
+                hashes = self.fetchLinkedHashes(heights)
+                # The chain changed since the previous chunk or while fetching this one, go back to finding the fork point
+                if hashes is None:
+                    return added
+            if self.withTimes:
+                with self.client.batch(self.batchSize) as batch:
+                    futures = [batch.getblock(blockHash) for blockHash in hashes]
+                blocks = [future.result() for future in futures]
+                for block, blockHash in zip(blocks, hashes):
+                    expected = self.hashAt(len(self) - 1) if len(self) else None
+                    # The chain changed while syncing, go back to finding the fork point
+                    if block.get('confirmations', 0) < 0 or block.get('previousblockhash') != expected:
+                        return added
+                    self.append(blockHash, block['time'])
+                    added += 1
+            else:
+                for blockHash in hashes:
+                    self.append(blockHash)
+                    added += 1
+        return added
+
+    def getblockcount(self):
+        """
+        ## Returns:
+
+        * The height of the indexed tip
+        """
+        return len(self) - 1
+
+    def getbestblockhash(self):
+        """
+        ## Returns:
+
+        * The hash of the indexed tip, or None if the index is empty
+        """
+        with self.lock:
+            return self.hashAt(len(self) - 1) if len(self) else None
+
+    def getblockhash(self, index):
+        """
+        ## Args:
+
+        * **index**: The block height
+
+        ## Returns:
+
+        * The hash of the block at the height, or None if the height is not indexed
+        """
+        with self.lock:
+            return self.hashAt(index) if 0 <= index < len(self) else None
+
+    def range(self, start, end):
+        """
+        ## Returns:
+
+        * The hashes of the indexed blocks from height *start* up to, not including, *end*
+        """
+        with self.lock:
+            end = min(end, len(self))
+            return [self.hashAt(height) for height in range(max(start, 0), end)]
+
+    def height(self, blockHash):
+        """
+        ## Returns:
+
+        * The height of the block with the hash, or None if it is not indexed
+        """
+        if self.byHash is None:
+            raise ValueError('HeaderIndex was created without hashIndex')
+        return self.byHash.get(bytes.fromhex(blockHash))
+
+    def header(self, blockHash):
+        """
+        ## Returns:
+
+        * A dict with the hash, height, previousblockhash and time of the block, or None if it is not indexed
+        """
+        with self.lock:
+            height = self.height(blockHash)
+            if height is None:
+                return None
+            return {
+                'hash': blockHash,
+                'height': height,
+                'previousblockhash': self.hashAt(height - 1) if height else None,
+                'time': self.times[height] if self.withTimes else None
+            }
+
+    def work(self):
+        self.sync()
+
+    def follow(self, interval=10):
+        """
+        Keeps the index synced on a background thread until *stop* is called.
+        The last error of a failed sync is kept in *error*, the thread carries on syncing.
+        ___
+        ## Args:
+
+        * **interval**: (optional) Seconds between syncs
+        """
+        self.interval = interval
+        return self.start()
@@ -0,0 +1,145 @@
+import codecs
+import json
+from .errors import RPCError
+
+WHITESPACE = ' \t\n\r'
+DELIMITERS = WHITESPACE + ',:]}'
+
+
+class StreamDecoder:
+    """
+    Decodes json values one at a time from a readable byte stream,
+    only holding the part of the document that has not been consumed yet.
+    ___
+    ## Args:
+
+    * **readable**: A file like object with a *read* method returning bytes
+
+    * **chunkSize**: (optional) The number of bytes read from the stream at a time
+    """
+
+    def __init__(self, readable, chunkSize=65536):
+        self.readable = readable
+        self.chunkSize = chunkSize
+        self.text = codecs.getincrementaldecoder('utf-8')()
+        self.decoder = json.JSONDecoder()
+        self.buffer = ''
+        self.pos = 0
+        self.eof = False
+
+    def fill(self):
+        chunk = self.readable.read(self.chunkSize)
+        if not chunk:
+            self.eof = True
+        self.buffer = self.buffer[self.pos:] + self.text.decode(chunk or b'', final=not chunk)
+        self.pos = 0
+        return not self.eof
+
+    def peek(self):
+        """
+        Skips whitespace and returns the next character without consuming it, or '' at the end of the stream.
+        """
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buffer) or not self.fill():
+                return self.buffer[self.pos:self.pos + 1]
+
+    def expect(self, character):
+        if self.peek() != character:
+            raise ValueError(f'Expected {character!r} at offset {self.pos} of the json stream')
+        self.pos += 1
+
+    def value(self):
+        """
+        Decodes and consumes the next complete json value.
+        """
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.pos)
+                # A number is only complete once a delimiter follows it, '12' may be the start of '12.5'
+                if self.eof or (end < len(self.buffer) and self.buffer[end] in DELIMITERS):
+                    self.pos = end
+                    return value
+            except ValueError:
+                if self.eof:
+                    raise
+            self.fill()
+
+    def keys(self):
+        """
+        Yields the keys of the json object at the current position, leaving the stream at the value of each key.
+        The caller has to consume every value before asking for the next key.
+        """
+        self.expect('{')
+        while True:
+            character = self.peek()
+            if character == '}':
+                self.pos += 1
+                return
+            if character == ',':
+                self.pos += 1
+                continue
+            key = self.value()
+            self.expect(':')
+            yield key
+
+    def items(self):
+        """
+        Yields the elements of the json array, or the (key, value) pairs of the json object, at the current position.
+        """
+        opening = self.peek()
+        closing = ']' if opening == '[' else '}'
+        self.expect(opening)
+        while True:
+            character = self.peek()
+            if character == closing:
+                self.pos += 1
+                return
+            if character == ',':
+                self.pos += 1
+                continue
+            if opening == '[':
+                yield self.value()
+            else:
+                key = self.value()
+                self.expect(':')
+                yield key, self.value()
+
+
+def iterResult(method, readable, chunkSize=65536):
+    """
+    Incrementally decodes a json rpc response, yielding the elements of its *result* one at a time.
+    ___
+    ## Args:
+
+    * **method**: The rpc method the response answers, used in error messages
+
+    * **readable**: A file like object with the response body
+
+    * **chunkSize**: (optional) The number of bytes read from the stream at a time
+
+    ## Returns:
+
+    * A generator of the elements when the result is an array, of (key, value) pairs when it is an object,
+    or of the result itself otherwise
+    """
+    stream = StreamDecoder(readable, chunkSize)
+    for key in stream.keys():
+        if key == 'result':
+            if stream.peek() in ('[', '{'):
+                yield from stream.items()
+            else:
+                result = stream.value()
+                if result is not None:
+                    yield result
+        elif key == 'error':
+            error = stream.value()
+            if error:
+                raise RPCError(method, error.get('code'), error.get('message'))
+        else:
+            stream.value()
+    # Drain the rest of the body so the connection can be reused
+    while readable.read(chunkSize):
+        pass
@@ -0,0 +1,106 @@
+import threading
+
+from .errors import RPCError
+from .worker import Worker
+
+ADDED = 'added'
+REMOVED = 'removed'
+
+
+class MempoolWatcher(Worker):
+    """
+    Watches the memory pool and tells subscribers which transactions entered and left it.
+
+    Each poll fetches only the list of txids with *getrawmempool* and compares it with the previous one.
+    Details are fetched with batched verbose *getrawtransaction* calls for new txids only,
+    so the work per poll follows the churn of the pool rather than its size.
+    Transactions that leave the pool before their details are fetched are skipped.
+    ```
+    watcher = MempoolWatcher(smileyObject)
+    watcher.subscribe(lambda event, txid, transaction: print(event, txid))
+    watcher.start()
+    ```
+    ___
+    ## Args:
+
+    * **client**: The smiley client to watch the pool with
+
+    * **interval**: (optional) Seconds between polls
+
+    * **batchSize**: (optional) The number of *getrawtransaction* calls sent per batch request
+
+    * **details**: (optional) If false no details are fetched and subscribers are given None as the transaction
+
+    * **initial**: (optional) If true the transactions already in the pool at the first poll are reported as added
+    """
+
+    workName = 'poll'
+
+    def __init__(self, client, interval=1, batchSize=500, details=True, initial=True):
+        super().__init__(interval)
+        self.client = client
+        self.batchSize = batchSize
+        self.details = details
+        self.initial = initial
+        self.txids = None
+        self.subscribers = []
+        self.lock = threading.Lock()
+
+    def subscribe(self, callback):
+        """
+        Registers a callback that is called with the event, either *added* or *removed*,
+        the txid and the verbose transaction, which is None for removed transactions.
+        ___
+        ## Returns:
+
+        * The callback, so *subscribe* can be used as a decorator
+        """
+        self.subscribers.append(callback)
+        return callback
+
+    def unsubscribe(self, callback):
+        self.subscribers.remove(callback)
+
+    def emit(self, event, txid, transaction):
+        for callback in list(self.subscribers):
+            callback(event, txid, transaction)
+
+    def fetch(self, txids):
+        if not self.details:
+            return {txid: None for txid in txids}
+        with self.client.batch(self.batchSize) as batch:
+            futures = [batch.getrawtransaction(txid, True) for txid in txids]
+        transactions = {}
+        for txid, future in zip(txids, futures):
+            try:
+                transactions[txid] = future.result()
+            except RPCError:
+                pass
+        return transactions
+
+    def poll(self):
+        """
+        Compares the pool with the previous poll once and delivers the events for the difference.
+        ___
+        ## Returns:
+
+        * The number of added and removed transactions, as a tuple
+        """
+        with self.lock:
+            current = set(self.client.getrawmempool())
+            if self.txids is None and not self.initial:
+                self.txids = current
+                return 0, 0
+            previous = self.txids or set()
+            removed = previous - current
+            for txid in removed:
+                self.emit(REMOVED, txid, None)
+            self.txids = previous - removed
+            transactions = self.fetch(list(current - previous))
+            for txid, transaction in transactions.items():
+                self.emit(ADDED, txid, transaction)
+                self.txids.add(txid)
+            return len(transactions), len(removed)
+
+    def work(self):
+        self.poll()
@@ -0,0 +1,156 @@
+import http.client
+import random
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+# Calls answered from chain state alone, which every node in sync gives the same answer to.
+# Calls about the tip are left out, a replica lagging a block behind would make consecutive answers go backwards.
+CHAIN_METHODS = frozenset([
+    'createmultisig', 'createrawtransaction', 'decoderawtransaction', 'decodescript', 'getallcouponlists',
+    'getallorglists', 'getblock', 'getblockhash', 'getbooklist', 'getcouponlist', 'getdexlist', 'getorglist',
+    'getrawtransaction', 'getrichaddresses', 'getserviceaddresses', 'gettxout', 'getubilist', 'verifymessage'
+])
+
+
+class Node:
+    """
+    A smileycoind node in a *NodePool*.
+    ___
+    ## Args:
+
+    * **name**: A name for the node used in *NodePool.status*
+
+    * **transport**: The transport used to call the node
+    """
+
+    def __init__(self, name, transport):
+        self.name = name
+        self.transport = transport
+        self.outstanding = 0
+        self.healthy = True
+        self.blockCount = None
+
+
+class NodePool:
+    """
+    Spreads read only chain calls over several smileycoind nodes.
+
+    Each call goes to the healthy node with the fewest outstanding requests. With *hedgeAfter* set,
+    a call that has not been answered after that many seconds is sent to a second node as well and
+    the first answer wins. A background health check asks every node for its *getblockcount*,
+    nodes that do not answer or lag more than *maxBlockLag* blocks behind the best node are ejected
+    until they catch up. A node that fails a call is ejected until the next health check.
+    ___
+    ## Args:
+
+    * **nodes**: A list of *Node* objects
+
+    * **probe**: A function taking a transport and returning the block count of its node
+
+    * **hedgeAfter**: (optional) Seconds before a slow call is hedged to a second node, defaults to no hedging
+
+    * **maxBlockLag**: (optional) The number of blocks a node may lag behind the best node
+
+    * **healthCheckInterval**: (optional) Seconds between health checks, None disables them
+    """
+
+    def __init__(self, nodes, probe, hedgeAfter=None, maxBlockLag=2, healthCheckInterval=10):
+        self.nodes = nodes
+        self.probe = probe
+        self.hedgeAfter = hedgeAfter
+        self.maxBlockLag = maxBlockLag
+        self.healthCheckInterval = healthCheckInterval
+        self.lock = threading.Lock()
+        self.stopped = threading.Event()
+        self.executor = ThreadPoolExecutor(max_workers=4 * len(nodes)) if hedgeAfter is not None else None
+        if healthCheckInterval:
+            threading.Thread(target=self.monitor, daemon=True).start()
+
+    def checkHealth(self):
+        """
+        Asks every node for its block count and ejects nodes that fail or lag behind.
+        """
+        def probe(node):
+            try:
+                return self.probe(node.transport)
+            except Exception:
+                return None
+
+        # Nodes are probed in parallel so one hung node does not hold up the checks of the others
+        with ThreadPoolExecutor(max_workers=len(self.nodes)) as executor:
+            for node, blockCount in zip(self.nodes, executor.map(probe, self.nodes)):
+                node.blockCount = blockCount
+        counts = [node.blockCount for node in self.nodes if node.blockCount is not None]
+        best = max(counts) if counts else None
+        for node in self.nodes:
+            node.healthy = node.blockCount is not None and best - node.blockCount <= self.maxBlockLag
+
+    def monitor(self):
+        while not self.stopped.is_set():
+            self.checkHealth()
+            self.stopped.wait(self.healthCheckInterval)
+
+    def choose(self, exclude=None):
+        with self.lock:
+            candidates = [node for node in self.nodes if node is not exclude]
+            healthy = [node for node in candidates if node.healthy]
+            if not candidates:
+                return None
+            node = min(healthy or candidates, key=lambda node: (node.outstanding, random.random()))
+            node.outstanding += 1
+            return node
+
+    def postTo(self, node, body, timeout):
+        try:
+            return node.transport.post(body, timeout)
+        except (OSError, http.client.HTTPException):
+            node.healthy = False
+            raise
+        finally:
+            with self.lock:
+                node.outstanding -= 1
+
+    def post(self, body, timeout=None):
+        """
+        Sends an encoded rpc request body to the best node, see *Transport.post*.
+        """
+        first = self.choose()
+        if self.executor is None:
+            return self.postTo(first, body, timeout)
+        futures = {self.executor.submit(self.postTo, first, body, timeout)}
+        done, _ = wait(futures, timeout=self.hedgeAfter)
+        if not done:
+            second = self.choose(exclude=first)
+            if second is not None:
+                futures.add(self.executor.submit(self.postTo, second, body, timeout))
+        error = None
+        while futures:
+            done, futures = wait(futures, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    return future.result()
+                error = future.exception()
+        raise error
+
+    def status(self):
+        """
+        ## Returns:
+
+        * A list with the name, health, block count and outstanding requests of every node
+        """
+        return [{
+            'name': node.name,
+            'healthy': node.healthy,
+            'blockCount': node.blockCount,
+            'outstanding': node.outstanding
+        } for node in self.nodes]
+
+    def close(self):
+        """
+        Stops the health checks and closes the connections to every node.
+        """
+        self.stopped.set()
+        if self.executor is not None:
+            self.executor.shutdown(wait=False)
+        for node in self.nodes:
+            node.transport.close()
@@ -0,0 +1,83 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from .errors import RPCError
+
+
+def transactionKey(transaction):
+    return (
+        transaction.get('txid'),
+        transaction.get('category'),
+        transaction.get('address'),
+        transaction.get('vout'),
+        transaction.get('amount'),
+        transaction.get('time')
+    )
+
+
+def iterTransactions(client, account='*', pageSize=100, limit=None, since=None, prefetch=True):
+    """
+    Walks the transaction history of an account from the newest transaction to the oldest,
+    fetching *pageSize* transactions per *listtransactions* call.
+
+    While a page is being consumed the next one is fetched in the background. Transactions that
+    arrive during the walk push older ones to higher offsets so the next page overlaps the previous one,
+    the overlap is detected by comparing each page with the previous one and dropped.
+    Bursts of more than *pageSize* new transactions between two pages can still produce duplicates.
+    ___
+    ## Args:
+
+    * **client**: The smiley client to fetch the transactions with
+
+    * **account**: (optional) The account to list transactions for, '*' for all accounts
+
+    * **pageSize**: (optional) The number of transactions fetched per call
+
+    * **limit**: (optional) Stop after this many transactions
+
+    * **since**: (optional) A datetime or unix timestamp, stop at the first transaction older than it
+
+    * **prefetch**: (optional) If true the next page is fetched while the current one is consumed
+
+    ## Returns:
+
+    * A generator of transactions, newest first, raising *RPCError* if a page cannot be fetched
+    """
+    if isinstance(since, datetime):
+        since = since.timestamp()
+    executor = ThreadPoolExecutor(max_workers=1) if prefetch else None
+
+    def fetch(skip):
+        if executor is None:
+            return client.listtransactions(account, pageSize, skip)
+        return executor.submit(client.listtransactions, account, pageSize, skip)
+
+    try:
+        skip = 0
+        pending = fetch(skip)
+        previousKeys = set()
+        yielded = 0
+        while True:
+            page = pending if executor is None else pending.result()
+            if page is None:
+                # The wrapper warns and returns None when the server answers with an error
+                raise RPCError('listtransactions', None, f'No result for the page at offset {skip}')
+            keys = [transactionKey(transaction) for transaction in page]
+            skip += pageSize
+            last = len(page) < pageSize
+            if not last:
+                pending = fetch(skip)
+            for transaction, key in zip(reversed(page), reversed(keys)):
+                if key in previousKeys:
+                    continue
+                if since is not None and transaction.get('time', since) < since:
+                    return
+                yield transaction
+                yielded += 1
+                if limit is not None and yielded >= limit:
+                    return
+            if last:
+                return
+            previousKeys = set(keys)
+    finally:
+        if executor is not None:
+            executor.shutdown(wait=False)
@@ -0,0 +1,335 @@
+import threading
+import time
+import uuid
+from concurrent.futures import Future
+
+from .addresses import isValidAddress
+from .amounts import fromSatoshi, toSatoshi
+from .database import LocalConnections
+from .errors import RPCError
+from .worker import Worker
+
+QUEUED = 'queued'
+SENDING = 'sending'
+SENT = 'sent'
+FAILED = 'failed'
+
+# Rough serialized sizes used to keep batches below maxBytes
+TRANSACTION_OVERHEAD = 10
+INPUT_SIZE = 148
+OUTPUT_SIZE = 34
+
+SCHEMA = [
+    'CREATE TABLE IF NOT EXISTS payments ('
+    ' id INTEGER PRIMARY KEY AUTOINCREMENT, key TEXT UNIQUE, address TEXT NOT NULL, amount INTEGER NOT NULL,'
+    ' created REAL NOT NULL, state TEXT NOT NULL, batch INTEGER, txid TEXT, error TEXT)',
+    'CREATE INDEX IF NOT EXISTS paymentsState ON payments (state, id)',
+    'CREATE INDEX IF NOT EXISTS paymentsBatch ON payments (batch)',
+    'CREATE TABLE IF NOT EXISTS batches ('
+    ' id INTEGER PRIMARY KEY AUTOINCREMENT, marker TEXT NOT NULL, started REAL NOT NULL, state TEXT NOT NULL,'
+    ' txid TEXT, error TEXT)'
+]
+
+
+class PayoutQueue(Worker):
+    """
+    Collects single payments and sends them together with *sendmany*, one transaction and fee
+    for many payments. Payments to the same address in a batch are merged into one output.
+
+    A batch is sent once it reaches *maxOutputs* recipients or an estimated *maxBytes*, or once its oldest
+    payment has waited *maxDelay* seconds. Payments and batches are kept in an SQLite database.
+    Every batch is sent with a unique comment, so after a crash or a lost answer the wallet is searched
+    for it: a batch that was sent is marked as sent and one that was not is queued again,
+    payments are neither paid twice nor dropped.
+    ```
+    payouts = PayoutQueue(smileyObject, 'payouts.db', maxDelay=30)
+    payouts.start()
+    future = payouts.submit('B8...', 12.5, key='reward-1234')
+    future.result()  # the txid of the batch
+    ```
+    ___
+    ## Args:
+
+    * **client**: The smiley client to send the batches with
+
+    * **path**: The path of the database file, created if it does not exist
+
+    * **fromAccount**: (optional) The account to send from
+
+    * **minconf**: (optional) Only use funds with at least this many confirmations
+
+    * **maxOutputs**: (optional) The maximum number of recipients in one transaction
+
+    * **maxBytes**: (optional) The maximum estimated size of one transaction
+
+    * **maxDelay**: (optional) Seconds a payment may wait for its batch to fill up
+
+    * **estimatedInputs**: (optional) The number of inputs assumed when estimating transaction sizes
+
+    * **recoverAfter**: (optional) Seconds after which a batch without an answer is looked up in the wallet
+    """
+
+    workName = 'flush'
+
+    def __init__(self, client, path, fromAccount='', minconf=1, maxOutputs=500, maxBytes=100000, maxDelay=60,
+                 estimatedInputs=10, recoverAfter=300):
+        self.client = client
+        self.path = path
+        self.fromAccount = fromAccount
+        self.minconf = minconf
+        self.maxOutputs = maxOutputs
+        self.maxBytes = maxBytes
+        self.maxDelay = maxDelay
+        self.estimatedInputs = estimatedInputs
+        self.recoverAfter = recoverAfter
+        self.futures = {}
+        self.connection = LocalConnections(path, rows=True)
+        self.lock = threading.RLock()
+        super().__init__(min(maxDelay, 1))
+        connection = self.connection()
+        with connection:
+            for statement in SCHEMA:
+                connection.execute(statement)
+        # Batches left sending by an earlier process are looked up right away
+        self.recovering = True
+
+    def submit(self, address, amount, key=None):
+        """
+        Queues a payment.
+        ___
+        ## Args:
+
+        * **address**: The smileycoin address to pay
+
+        * **amount**: The amount to pay, in smileycoins
+
+        * **key**: (optional) A unique key for the payment, submitting a key again returns the payment queued first
+
+        ## Returns:
+
+        * A future resolving to the txid of the transaction that pays it, its *paymentId* attribute is the id of the payment
+        """
+        if not isValidAddress(address):
+            raise ValueError(f'Invalid smileycoin address: {address!r}')
+        satoshi = toSatoshi(amount)
+        if satoshi <= 0:
+            raise ValueError(f'Invalid amount: {amount!r}')
+        connection = self.connection()
+        with self.lock:
+            with connection:
+                row = None if key is None else connection.execute(
+                    'SELECT id FROM payments WHERE key = ?', (key,)).fetchone()
+                if row is None:
+                    paymentId = connection.execute(
+                        'INSERT INTO payments (key, address, amount, created, state) VALUES (?, ?, ?, ?, ?)',
+                        (key, address, satoshi, time.time(), QUEUED)
+                    ).lastrowid
+                else:
+                    paymentId = row['id']
+            future = self.futures.get(paymentId)
+            if future is None:
+                future = self.futures[paymentId] = Future()
+                future.paymentId = paymentId
+                self.resolve(paymentId)
+        if self.due():
+            self.woken.set()
+        return future
+
+    def status(self, paymentId):
+        """
+        ## Returns:
+
+        * A dict with the address, amount, state, batch, txid and error of the payment, or None if there is no such payment
+        """
+        row = self.connection().execute('SELECT * FROM payments WHERE id = ?', (paymentId,)).fetchone()
+        if row is None:
+            return None
+        status = dict(row)
+        status['amount'] = fromSatoshi(status['amount'])
+        return status
+
+    def resolve(self, paymentId):
+        future = self.futures.get(paymentId)
+        if future is None:
+            return
+        row = self.connection().execute('SELECT state, txid, error FROM payments WHERE id = ?', (paymentId,)).fetchone()
+        if row['state'] == SENT:
+            future.set_result(row['txid'])
+        elif row['state'] == FAILED:
+            future.set_exception(RuntimeError(row['error']))
+        else:
+            return
+        del self.futures[paymentId]
+
+    def queued(self):
+        return self.connection().execute(
+            'SELECT id, address, amount, created FROM payments WHERE state = ? ORDER BY id', (QUEUED,)
+        ).fetchall()
+
+    def estimateSize(self, outputs):
+        return TRANSACTION_OVERHEAD + INPUT_SIZE * self.estimatedInputs + OUTPUT_SIZE * (outputs + 1)
+
+    def nextBatch(self, rows):
+        """
+        Takes payments in queue order until the batch would exceed *maxOutputs* or *maxBytes*.
+        """
+        addresses, taken = set(), []
+        for row in rows:
+            if row['address'] not in addresses:
+                if len(addresses) >= self.maxOutputs or self.estimateSize(len(addresses) + 1) > self.maxBytes:
+                    break
+                addresses.add(row['address'])
+            taken.append(row)
+        return taken, len(addresses)
+
+    def batchOutputs(self):
+        """
+        Returns the number of recipients that fill a batch, the lower of *maxOutputs* and what fits in *maxBytes*.
+        """
+        return max(1, min(self.maxOutputs, (self.maxBytes - self.estimateSize(0)) // OUTPUT_SIZE))
+
+    def due(self):
+        """
+        Returns true if the flush policy sends a batch now, without loading the whole queue.
+        """
+        connection = self.connection()
+        oldest = connection.execute(
+            'SELECT created FROM payments WHERE state = ? ORDER BY id LIMIT 1', (QUEUED,)
+        ).fetchone()
+        if oldest is None:
+            return False
+        if time.time() - oldest['created'] >= self.maxDelay:
+            return True
+        outputs = self.batchOutputs()
+        addresses = connection.execute(
+            'SELECT COUNT(*) FROM (SELECT DISTINCT address FROM payments WHERE state = ? LIMIT ?)', (QUEUED, outputs)
+        ).fetchone()[0]
+        return addresses >= outputs
+
+    def flush(self, force=True):
+        """
+        Sends the queued payments.
+        ___
+        ## Args:
+
+        * **force**: (optional) If false only batches that the flush policy considers full or overdue are sent
+
+        ## Returns:
+
+        * The number of batches sent
+        """
+        with self.lock:
+            self.recover()
+            sent = 0
+            while True:
+                rows = self.queued()
+                if not rows or not (force or self.due()):
+                    return sent
+                taken, _ = self.nextBatch(rows)
+                connection = self.connection()
+                with connection:
+                    batchId = connection.execute(
+                        'INSERT INTO batches (marker, started, state) VALUES (?, ?, ?)',
+                        (f'payout:{uuid.uuid4().hex}', time.time(), SENDING)
+                    ).lastrowid
+                    connection.executemany(
+                        'UPDATE payments SET state = ?, batch = ? WHERE id = ?',
+                        [(SENDING, batchId, row['id']) for row in taken]
+                    )
+                self.send(batchId)
+                sent += 1
+
+    def send(self, batchId):
+        connection = self.connection()
+        marker = connection.execute('SELECT marker FROM batches WHERE id = ?', (batchId,)).fetchone()['marker']
+        amounts = connection.execute(
+            'SELECT address, SUM(amount) FROM payments WHERE batch = ? GROUP BY address', (batchId,)
+        ).fetchall()
+        try:
+            txid = self.sendmany({address: fromSatoshi(amount) for address, amount in amounts}, marker)
+        except RPCError as error:
+            # The wallet refused the transaction, nothing was sent
+            self.finish(batchId, FAILED, None, str(error))
+            return
+        self.finish(batchId, SENT, txid, None)
+
+    def sendmany(self, amounts, marker):
+        """
+        Calls *sendmany* as a batch of one, unlike the plain wrapper that returns None when the wallet
+        refuses the transaction this raises an *RPCError*. Transport errors propagate as they are, the
+        transaction may have been sent then and the batch is left to *recover*.
+        """
+        with self.client.batch() as batch:
+            future = batch.sendmany(self.fromAccount, amounts, self.minconf, marker)
+        txid = future.result()
+        if not txid:
+            raise RPCError('sendmany', None, 'No txid returned')
+        return txid
+
+    def finish(self, batchId, state, txid, error):
+        connection = self.connection()
+        with connection:
+            connection.execute('UPDATE batches SET state = ?, txid = ?, error = ? WHERE id = ?',
+                               (state, txid, error, batchId))
+            paymentIds = [row[0] for row in connection.execute(
+                'SELECT id FROM payments WHERE batch = ?', (batchId,))]
+            connection.execute('UPDATE payments SET state = ?, txid = ?, error = ? WHERE batch = ?',
+                               (state, txid, error, batchId))
+        for paymentId in paymentIds:
+            self.resolve(paymentId)
+
+    def recover(self):
+        """
+        Looks up batches whose *sendmany* call never answered in the wallet by their comment.
+        Batches found are marked as sent, the payments of the others are queued again. When the wallet
+        cannot be searched the error propagates and the batches stay sending until the next attempt.
+        """
+        connection = self.connection()
+        cutoff = None if self.recovering else time.time() - self.recoverAfter
+        batches = [row for row in connection.execute(
+            'SELECT id, marker, started FROM batches WHERE state = ?', (SENDING,)
+        ).fetchall() if cutoff is None or row['started'] < cutoff]
+        if not batches:
+            self.recovering = False
+            return
+        markers = {row['marker']: row['id'] for row in batches}
+        since = min(row['started'] for row in batches) - 3600
+        found = {}
+        for transaction in self.client.iterTransactions('*', since=int(since)):
+            if transaction.get('category') == 'send' and transaction.get('comment') in markers:
+                found[markers[transaction['comment']]] = transaction['txid']
+        self.recovering = False
+        for row in batches:
+            if row['id'] in found:
+                self.finish(row['id'], SENT, found[row['id']], None)
+                continue
+            with connection:
+                connection.execute('UPDATE batches SET state = ?, error = ? WHERE id = ?',
+                                   (FAILED, 'Not found in the wallet, payments queued again', row['id']))
+                connection.execute('UPDATE payments SET state = ?, batch = NULL WHERE batch = ?', (QUEUED, row['id']))
+
+    def retry(self):
+        """
+        Queues the failed payments again, e.g. after the wallet was funded.
+        ___
+        ## Returns:
+
+        * The number of payments queued again
+        """
+        connection = self.connection()
+        with self.lock:
+            with connection:
+                return connection.execute(
+                    'UPDATE payments SET state = ?, batch = NULL, error = NULL WHERE state = ?', (QUEUED, FAILED)
+                ).rowcount
+
+    def work(self):
+        self.flush(force=False)
+
+    def stop(self, flush=True):
+        """
+        Stops the background thread, sending the queued payments first if *flush* is true.
+        """
+        super().stop()
+        if flush:
+            self.flush()
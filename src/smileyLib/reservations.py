@@ -0,0 +1,243 @@
+import time
+import uuid
+
+from .database import LocalConnections
+from .errors import RPCError
+from .worker import Worker
+
+SCHEMA = [
+    'CREATE TABLE IF NOT EXISTS leases ('
+    ' txid TEXT NOT NULL, vout INTEGER NOT NULL, lease TEXT NOT NULL, expires REAL NOT NULL,'
+    ' PRIMARY KEY (txid, vout))',
+    'CREATE INDEX IF NOT EXISTS leasesLease ON leases (lease)',
+    'CREATE INDEX IF NOT EXISTS leasesExpires ON leases (expires)'
+]
+
+
+def outpointObjects(outpoints):
+    return [{'txid': txid, 'vout': vout} for txid, vout in outpoints]
+
+
+class Lease:
+    """
+    A set of unspent outputs reserved for one builder until it is released or expires.
+    Used as a context manager the lease is committed when the block finishes, the outputs are taken
+    to be spent, and released when the block raises, the outputs are free for other builders again.
+    """
+
+    def __init__(self, reservations, leaseId, outpoints, expires):
+        self.reservations = reservations
+        self.id = leaseId
+        self.outpoints = outpoints
+        self.expires = expires
+        self.built = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, excType, excValue, traceback):
+        if excType is None:
+            self.commit()
+        else:
+            self.release()
+
+    def renew(self, ttl=None):
+        """
+        Extends the lease by *ttl* seconds from now.
+        """
+        self.expires = self.reservations.renew(self.id, ttl)
+
+    def commit(self):
+        """
+        Marks the outputs as spent. The reservation is kept until it expires, so builders working
+        from a list of unspent outputs fetched before the spend cannot pick them again.
+        """
+        self.renew()
+
+    def release(self):
+        """
+        Gives the outputs back unspent.
+        """
+        self.reservations.release(self.id)
+
+
+class UTXOReservations(Worker):
+    """
+    Hands out disjoint sets of unspent wallet outputs to builders working at the same time,
+    in threads or in separate processes sharing the database file.
+
+    Reservations are leases kept in an SQLite database and claimed atomically, every reserved output
+    is also locked with *lockunspent* so the wallet's own coin selection leaves it alone. Leases expire
+    after *ttl* seconds unless renewed, so a crashed builder does not hold its outputs forever.
+    Committed leases are kept until they expire as well, so *ttl* should be longer than it takes
+    to build a transaction.
+    smileycoind forgets its locks when it restarts, *maintain* locks the reserved outputs again
+    and unlocks expired ones, *start* runs it on a background thread.
+    ```
+    reservations = UTXOReservations(smileyObject, 'leases.db')
+    with reservations.lease(builder, {'B8...': 12.5}) as lease:
+        signed = smileyObject.signrawtransaction(lease.built['hex'])
+        smileyObject.sendrawtransaction(signed['hex'])
+    ```
+    ___
+    ## Args:
+
+    * **client**: The smiley client to lock the outputs with
+
+    * **path**: The path of the database file, created if it does not exist
+
+    * **ttl**: (optional) Seconds a lease lasts unless renewed
+    """
+
+    workName = 'maintenance'
+
+    def __init__(self, client, path, ttl=60):
+        super().__init__(10)
+        self.client = client
+        self.path = path
+        self.ttl = ttl
+        # Transactions are started explicitly, claims take the write lock up front with BEGIN IMMEDIATE
+        self.connection = LocalConnections(path, autocommit=True)
+        connection = self.connection()
+        for statement in SCHEMA:
+            connection.execute(statement)
+
+    def leased(self):
+        """
+        ## Returns:
+
+        * The set of (txid, vout) outpoints currently reserved by any lease
+        """
+        rows = self.connection().execute('SELECT txid, vout FROM leases WHERE expires >= ?', (time.time(),))
+        return {(txid, vout) for txid, vout in rows}
+
+    def reserve(self, outpoints, ttl=None):
+        """
+        Reserves every one of the outpoints or none of them.
+        ___
+        ## Args:
+
+        * **outpoints**: (txid, vout) tuples of the outputs to reserve
+
+        * **ttl**: (optional) Seconds the lease lasts, defaults to the *ttl* of the manager
+
+        ## Returns:
+
+        * A *Lease*, or None if any of the outputs is reserved already
+        """
+        outpoints = [(txid, vout) for txid, vout in outpoints]
+        now = time.time()
+        expires = now + (self.ttl if ttl is None else ttl)
+        leaseId = uuid.uuid4().hex
+        connection = self.connection()
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            for txid, vout in outpoints:
+                taken = connection.execute(
+                    'SELECT 1 FROM leases WHERE txid = ? AND vout = ? AND expires >= ?', (txid, vout, now)
+                ).fetchone()
+                if taken:
+                    connection.execute('ROLLBACK')
+                    return None
+            connection.executemany(
+                'INSERT OR REPLACE INTO leases VALUES (?, ?, ?, ?)',
+                [(txid, vout, leaseId, expires) for txid, vout in outpoints]
+            )
+            connection.execute('COMMIT')
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+        try:
+            # The wrapper answers an rpc error with None rather than raising
+            if not self.client.lockunspent(False, outpointObjects(outpoints)):
+                raise RPCError('lockunspent', None, 'The reserved outputs could not be locked')
+        except Exception:
+            try:
+                self.release(leaseId)
+            except RPCError:
+                # The lease is left expired, maintain unlocks its outputs later
+                pass
+            raise
+        return Lease(self, leaseId, outpoints, expires)
+
+    def lease(self, builder, payments, ttl=None, attempts=5, **kwargs):
+        """
+        Builds a transaction from outputs nobody else has reserved and reserves its inputs.
+        If another builder reserves one of the inputs first, the transaction is built again without it.
+        ___
+        ## Args:
+
+        * **builder**: The *TransactionBuilder* to build the transaction with
+
+        * **payments**: A dict of smileycoin addresses and amounts, passed to *TransactionBuilder.build*
+
+        * **ttl**: (optional) Seconds the lease lasts
+
+        * **attempts**: (optional) The number of times to build before giving up
+
+        Further keyword arguments are passed to *TransactionBuilder.build*.
+
+        ## Returns:
+
+        * A *Lease* whose *built* attribute is the result of *TransactionBuilder.build*
+        """
+        exclude = set(kwargs.pop('exclude', ()))
+        for _ in range(attempts):
+            built = builder.build(payments, exclude=exclude | self.leased(), **kwargs)
+            lease = self.reserve([(spent['txid'], spent['vout']) for spent in built['inputs']], ttl)
+            if lease is not None:
+                lease.built = built
+                return lease
+        raise RuntimeError(f'Could not reserve inputs after {attempts} attempts')
+
+    def renew(self, leaseId, ttl=None):
+        expires = time.time() + (self.ttl if ttl is None else ttl)
+        self.connection().execute('UPDATE leases SET expires = ? WHERE lease = ?', (expires, leaseId))
+        return expires
+
+    def release(self, leaseId):
+        """
+        Unlocks the outputs of a lease and drops it. If smileycoind does not unlock them the lease is
+        expired instead, *maintain* unlocks its outputs later.
+        """
+        connection = self.connection()
+        outpoints = connection.execute('SELECT txid, vout FROM leases WHERE lease = ?', (leaseId,)).fetchall()
+        if outpoints and not self.client.lockunspent(True, outpointObjects(outpoints)):
+            connection.execute('UPDATE leases SET expires = 0 WHERE lease = ?', (leaseId,))
+            raise RPCError('lockunspent', None, 'The released outputs could not be unlocked')
+        connection.execute('DELETE FROM leases WHERE lease = ?', (leaseId,))
+
+    def maintain(self):
+        """
+        Unlocks the outputs of expired leases and locks reserved outputs smileycoind has forgotten about,
+        e.g. after it restarted.
+        ___
+        ## Returns:
+
+        * The number of outputs unlocked and the number locked again, as a tuple
+        """
+        connection = self.connection()
+        now = time.time()
+        expired = connection.execute('SELECT txid, vout FROM leases WHERE expires < ?', (now,)).fetchall()
+        if expired:
+            # An expired output may have been reserved again in the meantime
+            released = set(expired) - self.leased()
+            # The leases are only dropped once their outputs are unlocked, otherwise the next run tries again
+            if released and not self.client.lockunspent(True, outpointObjects(sorted(released))):
+                raise RPCError('lockunspent', None, 'The outputs of expired leases could not be unlocked')
+            connection.execute('DELETE FROM leases WHERE expires < ?', (now,))
+        locked = {(entry['txid'], entry['vout']) for entry in self.client.listlockunspent() or []}
+        missing = sorted(self.leased() - locked)
+        if missing and not self.client.lockunspent(False, outpointObjects(missing)):
+            raise RPCError('lockunspent', None, 'The reserved outputs could not be locked again')
+        return len(expired), len(missing)
+
+    def work(self):
+        self.maintain()
+
+    def start(self, interval=10):
+        """
+        Runs *maintain* every *interval* seconds on a background daemon thread.
+        """
+        self.interval = interval
+        return super().start()
@@ -0,0 +1,98 @@
+import json
+import random
+import threading
+import time
+from .errors import CircuitOpenError
+
+# Calls that only read state and can safely be sent again when a first attempt failed
+IDEMPOTENT_METHODS = frozenset([
+    'createmultisig', 'createrawtransaction', 'decoderawtransaction', 'decodescript',
+    'getaccount', 'getaddednodeinfo', 'getaddressesbyaccount', 'getallcouponlists', 'getallorglists',
+    'getbalance', 'getbestblockhash', 'getblock', 'getblockchaininfo', 'getblockcount', 'getblockhash',
+    'getbooklist', 'getconnectioncount', 'getcouponlist', 'getdexlist', 'getdifficulty', 'getgenerate',
+    'gethashespersec', 'getinfo', 'getmininginfo', 'getnettotals', 'getnetworkinfo', 'getorglist',
+    'getpeerinfo', 'getrawmempool', 'getrawtransaction', 'getreceivedbyaccount', 'getreceivedbyaddress',
+    'getrichaddresses', 'getserviceaddresses', 'gettransaction', 'gettxout', 'gettxoutsetinfo',
+    'getubilist', 'getunconfirmedbalance', 'getwalletinfo', 'listaccounts', 'listaddressgroupings',
+    'listlockunspent', 'listreceivedbyaccount', 'listreceivedbyaddress', 'listsinceblock',
+    'listtransactions', 'listunspent', 'validateaddress', 'verifymessage'
+])
+
+# Error codes smileycoind answers with while it is not ready to serve calls
+RPC_IN_WARMUP = -28
+TRANSIENT_ERROR_CODES = frozenset([RPC_IN_WARMUP])
+
+
+def isTransient(status, body):
+    """
+    Tells whether an answer from the server means it is temporarily unable to serve calls,
+    e.g. a full rpc work queue or a node still loading the block index.
+    """
+    if status == 503:
+        return True
+    if status == 500 and body:
+        try:
+            error = json.loads(body).get('error') or {}
+        except (ValueError, AttributeError):
+            return False
+        return error.get('code') in TRANSIENT_ERROR_CODES
+    return False
+
+
+def backoffDelay(attempt, base=0.1, maximum=5):
+    """
+    Returns a randomly jittered exponential backoff delay for a retry attempt, counted from 0.
+    """
+    return random.uniform(0, min(maximum, base * 2 ** attempt))
+
+
+class CircuitBreaker:
+    """
+    Fails calls fast while the server is unhealthy.
+
+    After *threshold* consecutive failures the circuit opens and calls raise *CircuitOpenError*
+    without reaching the server. Once *resetTimeout* seconds have passed a single trial call is
+    let through, its success closes the circuit again and its failure keeps it open.
+    ___
+    ## Args:
+
+    * **threshold**: The number of consecutive failures that opens the circuit
+
+    * **resetTimeout**: (optional) Seconds the circuit stays open before a trial call is allowed
+    """
+
+    def __init__(self, threshold, resetTimeout=30):
+        self.threshold = threshold
+        self.resetTimeout = resetTimeout
+        self.failures = 0
+        self.openedAt = None
+        self.trialRunning = False
+        self.lock = threading.Lock()
+
+    def before(self):
+        """
+        Raises *CircuitOpenError* if a call should not be sent to the server right now.
+        """
+        with self.lock:
+            if self.openedAt is None:
+                return
+            if self.trialRunning or time.monotonic() - self.openedAt < self.resetTimeout:
+                raise CircuitOpenError(f'Circuit open after {self.failures} consecutive failures')
+            self.trialRunning = True
+
+    def success(self):
+        with self.lock:
+            self.failures = 0
+            self.openedAt = None
+            self.trialRunning = False
+
+    def failure(self):
+        with self.lock:
+            self.failures += 1
+            if self.trialRunning or self.failures >= self.threshold:
+                self.openedAt = time.monotonic()
+            self.trialRunning = False
+
+    @property
+    def isOpen(self):
+        return self.openedAt is not None
@@ -3,9 +3,32 @@ import atexit
 import psutil
 import warnings
 import json
-import requests
-import base64
+import itertools
+import copy
+import contextlib
+import http.client
+import threading
+import time
 from datetime import datetime
+from .transport import Transport, HTTPTransport, UnixSocketTransport, RequestsTransport
+from .batch import Batch
+from .fanout import fanOut
+from .errors import RPCError, DeadlineExceeded
+from .resilience import IDEMPOTENT_METHODS, CircuitBreaker, isTransient, backoffDelay
+from .jsonstream import iterResult
+from .pagination import iterTransactions
+from .blocks import iterBlocks
+from .export import exportColumns
+from .nodes import CHAIN_METHODS, Node, NodePool
+from .cache import LRUCache, ChainCache, TipCache
+from .diskCache import SQLiteCache, TieredCache
+from .coalesce import SingleFlight
+from .addresses import checkAddress, validateAddresses
+
+try:
+    import orjson as fastjson
+except ImportError:
+    fastjson = json
 
 class smiley:
     """
@@ -19,7 +42,43 @@ class smiley:
         startServer: boolean,       # If true, the server will be started before the python script runs
         rpcUser: string,            # The rpc user to use when connecting to the server
         rpcPassword: string,        # The rpc password to use when connecting to the server
-        rpcPort: string             # The rpc port to use when connecting to the server
+        rpcPort: string,            # The rpc port to use when connecting to the server
+        rpcHost: string,            # (optional) The host of the server, defaults to 'localhost'
+        rpcSocket: string,          # (optional) Path of a Unix domain socket to connect through instead of host and port
+        transport: string,          # (optional) 'http' for the built in http.client transport, 'requests' to use the
+                                    #            requests library, or a Transport instance, defaults to 'http'
+        poolSize: int,              # (optional) Number of hosts to keep connection pools for with 'requests', defaults to 1
+        poolMaxSize: int,           # (optional) Maximum number of keep-alive connections to the server, defaults to 10
+        poolBlock: boolean,         # (optional) If true, calls wait for a free pooled connection, defaults to False
+        idleTimeout: float,         # (optional) Seconds before idle pooled connections are closed, defaults to 60
+        keepAlive: boolean,         # (optional) If false, connections are closed after every call, defaults to True
+        batchChunkSize: int,        # (optional) Maximum number of calls sent per batch request, defaults to 500
+        jsonCodec: module,          # (optional) Module with loads and dumps used to encode and decode calls,
+                                    #            defaults to orjson when installed, otherwise json
+        timeout: float,             # (optional) Seconds to wait for the server on each call, defaults to no timeout
+        methodTimeouts: dict,       # (optional) Timeouts for single methods overriding timeout, e.g. {'getblock': 5}
+        retries: int,               # (optional) Times a failed read only call is retried, defaults to 0
+        retryBackoff: float,        # (optional) Base seconds of the jittered exponential backoff, defaults to 0.1
+        retryBackoffMax: float,     # (optional) Maximum seconds between retries, defaults to 5
+        circuitBreakerThreshold: int, # (optional) Consecutive failures before calls fail fast, defaults to disabled
+        circuitBreakerReset: float, # (optional) Seconds before a trial call is let through an open circuit, defaults to 30
+        nodes: list,                # (optional) Replica nodes for read only chain calls, each a dict with rpcHost,
+                                    #            rpcPort and optionally rpcUser, rpcPassword and rpcSocket. The node
+                                    #            configured above stays the wallet node all other calls are pinned to
+        hedgeAfter: float,          # (optional) Seconds before a slow chain call is also sent to a second node
+        maxBlockLag: int,           # (optional) Blocks a node may lag behind the best node before it is ejected, defaults to 2
+        healthCheckInterval: float, # (optional) Seconds between getblockcount health checks of the nodes, defaults to 10
+        healthCheckTimeout: float,  # (optional) Seconds a node may take to answer a health check, defaults to 5
+        cacheMaxBytes: int,         # (optional) Enables an in memory cache of immutable chain data holding about this many bytes
+        cacheConfirmations: int,    # (optional) Confirmations after which blocks and transactions are cached, defaults to 6
+        cachePath: string,          # (optional) Enables a persistent SQLite cache of immutable chain data in this file,
+                                    #            behind the in memory cache when cacheMaxBytes is set too
+        cacheDiskMaxBytes: int,     # (optional) Maximum size of the persistent cache, defaults to 1 GiB
+        volatileCache: boolean/dict,# (optional) Serve getblockcount, getinfo, getdifficulty, ... from memory until their
+                                    #            time to live passes or a new tip is seen. True uses the default time
+                                    #            to live per method, a dict of method names to seconds overrides them
+        tipProbeInterval: float,    # (optional) Seconds between getbestblockhash checks for a new tip, defaults to 1
+        coalesce: boolean           # (optional) If true, concurrent identical read only calls share one request, defaults to False
     }
     ```
     """
@@ -43,24 +102,464 @@ class smiley:
             self.serverStarted = False
             self.serverHandled = False
 
+    def close(self):
+        """
+        Closes the pooled connections to the server and stops the health checks of the *nodes* option.
+        The client can also be used as a context manager that closes it on exit.
+        """
+        if self.nodePool is not None:
+            self.nodePool.close()
+        self.transport.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, excType, excValue, traceback):
+        self.close()
+
     def __communicateWithServer(self, method, data=[]):
-        data = json.dumps({
+        return self._rpc(method, data)
+
+    def _encodeRequest(self, method, params):
+        data = self.jsonCodec.dumps({
             "jsonrpc": "1.0",
             "id": method + "_python_client",
             "method": method,
-            "params": data
+            "params": params
         })
-        response = requests.get(
-            f'http://localhost:{self.rpcPort}',
-            headers={'content-type': 'text/plain'},
-            auth=(self.rpcUser, self.rpcPassword),
-            data=data.encode()
-        )
-        if response.status_code != 200:
-            warnings.warn(f'Error communicating with server: {response.status_code}')
-            print(json.dumps(response.json(), indent=4))
+        return data if isinstance(data, bytes) else data.encode()
+
+    def _decodeResponse(self, status, body):
+        if status != 200:
+            warnings.warn(f'Error communicating with server: {status}')
+            if body:
+                print(json.dumps(json.loads(body), indent=4))
+            return None
+        return self.jsonCodec.loads(body)['result']
+
+    def _encodeBatch(self, calls):
+        ids = [f'{method}_python_client_{next(self.requestIds)}' for method, _ in calls]
+        data = self.jsonCodec.dumps([{
+            "jsonrpc": "1.0",
+            "id": requestId,
+            "method": method,
+            "params": params
+        } for requestId, (method, params) in zip(ids, calls)])
+        return ids, data if isinstance(data, bytes) else data.encode()
+
+    def _decodeBatch(self, calls, ids, status, body):
+        if status != 200:
+            raise RPCError('batch', status, body.decode(errors='replace'))
+        responses = {response['id']: response for response in self.jsonCodec.loads(body)}
+        outcomes = []
+        for requestId, (method, _) in zip(ids, calls):
+            response = responses.get(requestId)
+            if response is None:
+                outcomes.append(RPCError(method, None, 'No response in batch'))
+            elif response.get('error'):
+                outcomes.append(RPCError(method, response['error'].get('code'), response['error'].get('message')))
+            else:
+                outcomes.append(response['result'])
+        return outcomes
+
+    def _timeoutFor(self, method):
+        timeout = self.methodTimeouts.get(method, self.timeout)
+        deadline = getattr(self.deadlines, 'value', None)
+        if deadline is None:
+            return timeout
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise DeadlineExceeded(f'Deadline exceeded before calling {method}')
+        return remaining if timeout is None else min(timeout, remaining)
+
+    def _retryDelay(self, attempt):
+        delay = backoffDelay(attempt, self.retryBackoff, self.retryBackoffMax)
+        deadline = getattr(self.deadlines, 'value', None)
+        if deadline is not None and time.monotonic() + delay >= deadline:
             return None
-        return response.json()['result']
+        return delay
+
+    def _post(self, body, timeout, chain):
+        if chain and self.nodePool is not None:
+            return self.nodePool.post(body, timeout)
+        return self.transport.post(body, timeout)
+
+    def _send(self, method, body, idempotent, chain=False):
+        attempt = 0
+        while True:
+            timeout = self._timeoutFor(method)
+            if self.circuitBreaker is not None:
+                self.circuitBreaker.before()
+            error = None
+            try:
+                status, content = self._post(body, timeout, chain)
+            except (OSError, http.client.HTTPException) as exception:
+                error = exception
+            except BaseException:
+                # Any other way out of the call still has to end a trial call of the circuit breaker
+                if self.circuitBreaker is not None:
+                    self.circuitBreaker.failure()
+                raise
+            if error is None and not isTransient(status, content):
+                if self.circuitBreaker is not None:
+                    self.circuitBreaker.success()
+                return status, content
+            if self.circuitBreaker is not None:
+                self.circuitBreaker.failure()
+            delay = self._retryDelay(attempt) if idempotent and attempt < self.retries else None
+            if delay is None:
+                if error is not None:
+                    raise error
+                return status, content
+            time.sleep(delay)
+            attempt += 1
+
+    def _rpc(self, method, params):
+        key = cache = None
+        for cache in self.caches:
+            key, cached = cache.lookup(method, params)
+            if cached is not None:
+                return self._decodeResponse(200, cached)
+            if key is not None:
+                break
+        body = self._encodeRequest(method, params)
+        idempotent = method in IDEMPOTENT_METHODS
+        if self.singleFlight is not None and idempotent:
+            status, body = self.singleFlight.do(body, lambda: self._send(method, body, True, method in CHAIN_METHODS))
+        else:
+            status, body = self._send(method, body, idempotent, method in CHAIN_METHODS)
+        result = self._decodeResponse(status, body)
+        if key is not None and status == 200:
+            cache.admit(key, method, params, result, body)
+        return result
+
+    def _rpcBatch(self, calls):
+        ids, data = self._encodeBatch(calls)
+        idempotent = all(method in IDEMPOTENT_METHODS for method, _ in calls)
+        chain = all(method in CHAIN_METHODS for method, _ in calls)
+        status, body = self._send('batch', data, idempotent, chain)
+        return self._decodeBatch(calls, ids, status, body)
+
+    def _rpcStream(self, method, params):
+        breaker = self.circuitBreaker
+        if breaker is not None:
+            breaker.before()
+        reported = False
+
+        def report(healthy):
+            nonlocal reported
+            if breaker is not None and not reported:
+                (breaker.success if healthy else breaker.failure)()
+            reported = True
+
+        try:
+            with self.transport.stream(self._encodeRequest(method, params), self._timeoutFor(method)) as (status, response):
+                if status != 200:
+                    content = response.read()
+                    report(not isTransient(status, content))
+                    try:
+                        error = self.jsonCodec.loads(content).get('error') or {}
+                    except (ValueError, AttributeError):
+                        error = {}
+                    raise RPCError(method, error.get('code', status),
+                                   error.get('message', content.decode(errors='replace')))
+                # The outcome is reported once the answer starts, the consumer may stop reading early
+                report(True)
+                yield from iterResult(method, response)
+        finally:
+            # Transport errors and anything else that ended the call before an answer count as failures
+            report(False)
+
+    def _createTransport(self, options):
+        transport = options.get('transport', 'http')
+        if isinstance(transport, Transport):
+            return transport
+        host = options.get('rpcHost', 'localhost')
+        pool = {
+            'poolMaxSize': options.get('poolMaxSize', 10),
+            'poolBlock': options.get('poolBlock', False),
+            'idleTimeout': options.get('idleTimeout', 60),
+            'keepAlive': options.get('keepAlive', True)
+        }
+        if transport == 'requests':
+            return RequestsTransport(
+                f'http://{host}:{options["rpcPort"]}',
+                options['rpcUser'],
+                options['rpcPassword'],
+                poolSize=options.get('poolSize', 1),
+                **pool
+            )
+        if transport != 'http':
+            raise ValueError(f'Unknown transport: {transport}')
+        if options.get('rpcSocket'):
+            return UnixSocketTransport(options['rpcSocket'], options['rpcUser'], options['rpcPassword'], **pool)
+        return HTTPTransport(host, options['rpcPort'], options['rpcUser'], options['rpcPassword'], **pool)
+
+    def _createSingleFlight(self):
+        return SingleFlight()
+
+    def _createCaches(self, options):
+        chainCache = tipCache = None
+        store = LRUCache(options['cacheMaxBytes']) if options.get('cacheMaxBytes') else None
+        if options.get('cachePath'):
+            disk = SQLiteCache(options['cachePath'], options.get('cacheDiskMaxBytes', 1 << 30))
+            store = TieredCache(store, disk) if store is not None else disk
+        if store is not None:
+            chainCache = ChainCache(
+                store,
+                lambda: self._rpc('getblockcount', []),
+                confirmations=options.get('cacheConfirmations', 6)
+            )
+        if options.get('volatileCache'):
+            ttls = options['volatileCache'] if isinstance(options['volatileCache'], dict) else None
+            tipCache = TipCache(
+                lambda: self._rpc('getbestblockhash', []),
+                ttls,
+                probeInterval=options.get('tipProbeInterval', 1)
+            )
+        return chainCache, tipCache
+
+    def _createNodePool(self, options):
+        if not options.get('nodes'):
+            return None
+        nodes = [Node('wallet', self.transport)]
+        shared = {key: value for key, value in options.items() if key not in ('transport', 'rpcHost', 'rpcSocket')}
+        for node in options['nodes']:
+            nodeOptions = dict(shared, **node)
+            name = node.get('rpcSocket') or f'{nodeOptions.get("rpcHost", "localhost")}:{nodeOptions["rpcPort"]}'
+            nodes.append(Node(name, self._createTransport(nodeOptions)))
+
+        healthCheckTimeout = options.get('healthCheckTimeout', 5)
+
+        def probe(transport):
+            status, body = transport.post(self._encodeRequest('getblockcount', []), healthCheckTimeout)
+            return self.jsonCodec.loads(body)['result'] if status == 200 else None
+
+        return NodePool(
+            nodes,
+            probe,
+            hedgeAfter=options.get('hedgeAfter'),
+            maxBlockLag=options.get('maxBlockLag', 2),
+            healthCheckInterval=options.get('healthCheckInterval', 10)
+        )
+
+    def batch(self, chunkSize=None):
+        """
+        Starts a batch of calls that are sent to the server together.
+        Calls made on the returned batch take the same arguments as on the *smiley* object
+        but return futures instead of results.
+        ```
+        with smileyObject.batch() as batch:
+            blocks = [batch.getblock(hash) for hash in hashes]
+        ```
+        ___
+        ## Args:
+
+        * **chunkSize**: (optional) The maximum number of calls per http request, defaults to the *batchChunkSize* option
+
+        ## Returns:
+
+        * A *Batch* object which sends its calls when the with block exits or *send* is called
+        """
+        return Batch(self, chunkSize or self.batchChunkSize)
+
+    @contextlib.contextmanager
+    def deadline(self, seconds):
+        """
+        Bounds the total time of every call made by the current thread inside the with block.
+        Each call waits at most until the deadline, retries stop once it would be passed,
+        and calls made after it has passed raise *DeadlineExceeded*.
+        ```
+        with smileyObject.deadline(2):
+            block = smileyObject.getblock(smileyObject.getbestblockhash())
+        ```
+        ___
+        ## Args:
+
+        * **seconds**: The number of seconds the calls in the block may take together
+        """
+        previous = getattr(self.deadlines, 'value', None)
+        deadline = time.monotonic() + seconds
+        self.deadlines.value = deadline if previous is None else min(previous, deadline)
+        try:
+            yield
+        finally:
+            self.deadlines.value = previous
+
+    def cacheStats(self):
+        """
+        Returns the statistics of the caches enabled with the *cacheMaxBytes*, *cachePath* and *volatileCache* options.
+        ___
+        ## Returns:
+
+        * A dict with the statistics of the immutable chain data cache under *chain*, split in *memory* and *disk*
+        when both are enabled, and of the volatile call cache under *volatile*. Disabled caches are None
+        """
+        return {
+            'chain': self.chainCache.stats() if self.chainCache is not None else None,
+            'volatile': self.tipCache.stats() if self.tipCache is not None else None
+        }
+
+    def coalesceStats(self):
+        """
+        Returns how many calls were deduplicated by the *coalesce* option.
+        ___
+        ## Returns:
+
+        * A dict with the number of coalescable calls, the number of calls that shared another call's request
+        and the requests in flight, or None when coalescing is disabled
+        """
+        return self.singleFlight.stats() if self.singleFlight is not None else None
+
+    def stream(self, method, *args, **kwargs):
+        """
+        Calls an rpc method and incrementally decodes its answer, yielding the result one element at a time
+        so memory stays bounded for huge answers such as *listunspent* or *getrawmempool(verbose=True)*.
+        The answer is decoded with the standard json module whatever the *jsonCodec* option is, and an
+        error answer raises *RPCError* whether the server sends it with an error status or not.
+        ```
+        for unspent in smileyObject.stream('listunspent', 0):
+            ...
+        for txid, entry in smileyObject.stream('getrawmempool', True):
+            ...
+        ```
+        ___
+        ## Args:
+
+        * **method**: The name of the *smiley* method to call
+
+        * **args**, **kwargs**: The arguments of the method
+
+        ## Returns:
+
+        * A generator of the elements of an array result, of (key, value) pairs of an object result,
+        or of the result itself otherwise
+        """
+        proxy = copy.copy(self)
+        proxy._rpc = self._rpcStream
+        return getattr(proxy, method)(*args, **kwargs)
+
+    def iterTransactions(self, account='*', pageSize=100, limit=None, since=None, prefetch=True):
+        """
+        Walks the whole transaction history of an account, newest first, without hand written skip/count loops.
+        The next page is fetched in the background while the current one is consumed, and transactions
+        arriving during the walk do not cause duplicates.
+        ```
+        for transaction in smileyObject.iterTransactions(pageSize=1000, since=datetime(2021, 1, 1)):
+            ...
+        ```
+        ___
+        ## Args:
+
+        * **account**: (optional) The account to list transactions for, '*' for all accounts
+
+        * **pageSize**: (optional) The number of transactions fetched per *listtransactions* call
+
+        * **limit**: (optional) Stop after this many transactions
+
+        * **since**: (optional) A datetime or unix timestamp, stop at the first transaction older than it
+
+        * **prefetch**: (optional) If true the next page is fetched while the current one is consumed
+
+        ## Returns:
+
+        * A generator of transactions, newest first
+        """
+        return iterTransactions(self, account, pageSize, limit, since, prefetch)
+
+    def iterBlocks(self, start=0, end=None, batchSize=50, concurrency=4, verbose=True, checkpoint=None,
+                   checkpointEvery=100):
+        """
+        Walks a range of blocks in height order, fetching hashes and blocks in batches on parallel workers
+        while only a bounded window of blocks is held in memory.
+        ```
+        for height, hash, block in smileyObject.iterBlocks(0, checkpoint='blocks.checkpoint'):
+            ...
+        ```
+        ___
+        ## Args:
+
+        * **start**: (optional) The height of the first block
+
+        * **end**: (optional) The height of the last block, defaults to the current tip
+
+        * **batchSize**: (optional) The number of blocks fetched per batch request
+
+        * **concurrency**: (optional) The number of batches fetched at the same time
+
+        * **verbose**: (optional) If false blocks are returned as hex strings
+
+        * **checkpoint**: (optional) The path of a file recording the progress, an existing checkpoint resumes the walk after it
+
+        * **checkpointEvery**: (optional) The number of blocks between checkpoint writes
+
+        ## Returns:
+
+        * A generator of (height, hash, block) tuples
+        """
+        return iterBlocks(self, start, end, batchSize, concurrency, verbose, checkpoint, checkpointEvery)
+
+    def exportColumns(self, directory, start=0, end=None, confirmations=6, flushEvery=1000, batchSize=50,
+                      concurrency=4):
+        """
+        Exports a range of blocks with their transactions, inputs and outputs into typed column files,
+        with amounts in integer satoshis, that can be loaded as numpy arrays with *loadColumns*.
+        Stopped exports continue where they left off when run again with the same directory.
+        ```
+        smileyObject.exportColumns('chain', start=0)
+        outputs = loadColumns('chain', 'outputs')
+        outputs['value'].sum()
+        ```
+        ___
+        ## Args:
+
+        * **directory**: The directory the column files are written to
+
+        * **start**: (optional) The height of the first block
+
+        * **end**: (optional) The height of the last block, defaults to the last block with *confirmations* confirmations
+
+        * **confirmations**: (optional) The confirmations the last block needs when *end* is not given
+
+        * **flushEvery**: (optional) The number of blocks between writes to disk
+
+        * **batchSize**: (optional) The number of blocks fetched per batch request
+
+        * **concurrency**: (optional) The number of batches fetched at the same time
+
+        ## Returns:
+
+        * A dict of the number of rows in each table
+        """
+        return exportColumns(self, directory, start, end, confirmations, flushEvery, batchSize, concurrency)
+
+    def map(self, method, argumentIterable, concurrency=8, ordered=True, returnExceptions=False):
+        """
+        Calls an rpc method once for every argument tuple with bounded parallelism.
+        The arguments are consumed lazily and results are streamed,
+        so arbitrarily long inputs can be processed with flat memory.
+        ```
+        for transaction in smileyObject.map('gettransaction', txids, concurrency=16):
+            ...
+        ```
+        ___
+        ## Args:
+
+        * **method**: The name of the *smiley* method to call, e.g. *validateaddress*
+
+        * **argumentIterable**: An iterable of argument tuples, other values are passed as the single argument
+
+        * **concurrency**: (optional) The maximum number of calls in flight
+
+        * **ordered**: (optional) If true results are yielded in input order, otherwise as they complete
+
+        * **returnExceptions**: (optional) If true failed calls yield their exception instead of raising it
+
+        ## Returns:
+
+        * A generator of results when *ordered*, otherwise of (arguments, result) tuples
+        """
+        return fanOut(getattr(self, method), argumentIterable, concurrency, ordered, returnExceptions)
 
     def addchapter(self, servicename, chapternumber, chapteraddress):
         """
@@ -276,7 +775,8 @@ class smiley:
         * A hex-encoded raw transaction
         """
         if data:
-            addresses.append({'data': base64.b16encode(data)})
+            data = data.encode() if isinstance(data, str) else bytes(data)
+            addresses = dict(addresses, data=data.hex())
         return self.__communicateWithServer('createrawtransaction', [transactions, addresses])
 
     def createservice(self, servicename, serviceaddress, servicetype):
@@ -1057,7 +1557,7 @@ class smiley:
 
         * **newsize**: (optional) The new keypool size.
         """
-        self.__communicateWithServer('keypoolrefill', [newsize])
+        return self.__communicateWithServer('keypoolrefill', [newsize])
 
     def listaccounts(self, minconf=1):
         """
@@ -1151,6 +1651,8 @@ class smiley:
         """
         if blockhash:
             return self.__communicateWithServer('listsinceblock', [blockhash, target_confirmations])
+        elif target_confirmations != 1:
+            return self.__communicateWithServer('listsinceblock', ['', target_confirmations])
         else:
             return self.__communicateWithServer('listsinceblock')
 
@@ -1465,6 +1967,35 @@ class smiley:
         warnings.warn("Warning: validateaddress has not been tested yet...")
         return self.__communicateWithServer('validateaddress', [smileycoinaddress])
 
+    def validateaddresses(self, smileycoinaddresses, wallet=False, processes=None):
+        """
+        Validates many smileycoin addresses at once. Version bytes and checksums are checked locally,
+        *validateaddress* is only called, in batches, for the valid addresses when the wallet fields are wanted.
+        ___
+        ## Args:
+
+        * **smileycoinaddresses**: The smileycoin addresses to validate.
+
+        * **wallet**: (optional) If true, wallet specific fields such as ismine are fetched from the server.
+
+        * **processes**: (optional) The number of worker processes to check long lists with.
+
+        ## Returns:
+
+        * A dict from each address to the information *validateaddress* returns about it.
+        """
+        smileycoinaddresses = list(smileycoinaddresses)
+        valid = validateAddresses(smileycoinaddresses, processes)
+        results = {address: checkAddress(address) if isValid else {'isvalid': False}
+                   for address, isValid in zip(smileycoinaddresses, valid)}
+        if wallet:
+            owned = [address for address, isValid in zip(smileycoinaddresses, valid) if isValid]
+            with self.batch() as batch:
+                futures = [batch.validateaddress(address) for address in owned]
+            for address, future in zip(owned, futures):
+                results[address].update(future.result())
+        return results
+
     def verifychain(self, checklevel=3, nblocks=288):
         """
         Verifies blockchain database.
@@ -1510,6 +2041,24 @@ class smiley:
         self.rpcUser = options['rpcUser']
         self.rpcPassword = options['rpcPassword']
         self.rpcPort = options['rpcPort']
+        self.rpcHost = options.get('rpcHost', 'localhost')
+        self.rpcSocket = options.get('rpcSocket')
+        self.jsonCodec = options.get('jsonCodec', fastjson)
+        self.timeout = options.get('timeout')
+        self.methodTimeouts = options.get('methodTimeouts', {})
+        self.retries = options.get('retries', 0)
+        self.retryBackoff = options.get('retryBackoff', 0.1)
+        self.retryBackoffMax = options.get('retryBackoffMax', 5)
+        threshold = options.get('circuitBreakerThreshold')
+        self.circuitBreaker = CircuitBreaker(threshold, options.get('circuitBreakerReset', 30)) if threshold else None
+        self.deadlines = threading.local()
+        self.transport = self._createTransport(options)
+        self.nodePool = self._createNodePool(options)
+        self.chainCache, self.tipCache = self._createCaches(options)
+        self.caches = [cache for cache in (self.chainCache, self.tipCache) if cache is not None]
+        self.singleFlight = self._createSingleFlight() if options.get('coalesce') else None
+        self.batchChunkSize = options.get('batchChunkSize', 500)
+        self.requestIds = itertools.count()
         self.startServer()
         atexit.register(self.stopServer)
 
@@ -0,0 +1,409 @@
+import asyncio
+import base64
+import contextlib
+import http.client
+import io
+import select
+import socket
+import threading
+import time
+
+try:
+    import requests
+    from requests.adapters import HTTPAdapter
+except ImportError:
+    requests = None
+
+
+def basicAuth(rpcUser, rpcPassword):
+    credentials = base64.b64encode(f'{rpcUser}:{rpcPassword}'.encode()).decode()
+    return f'Basic {credentials}'
+
+
+def isDropped(connection):
+    """
+    Checks whether the server has closed an idle connection. An idle keep-alive connection should have
+    nothing to read, if it is readable the server either closed it or sent something unexpected.
+    """
+    if connection.sock is None:
+        return False
+    try:
+        readable, _, _ = select.select([connection.sock], [], [], 0)
+    except (OSError, ValueError):
+        return True
+    return bool(readable)
+
+
+class Transport:
+    """
+    The interface every *smiley* transport implements.
+    A transport sends an encoded json rpc request body to smileycoind and returns the raw answer,
+    it is given to *smiley* through the *transport* option.
+    """
+
+    def post(self, body, timeout=None):
+        """
+        Sends an encoded rpc request body to the server.
+        ___
+        ## Args:
+
+        * **body**: The encoded json rpc request
+
+        * **timeout**: (optional) Seconds to wait for the server before giving up
+
+        ## Returns:
+
+        * A tuple of the http status code and the raw response body
+        """
+        raise NotImplementedError
+
+    @contextlib.contextmanager
+    def stream(self, body, timeout=None):
+        """
+        Sends an encoded rpc request body to the server without reading the answer up front.
+        Transports that cannot stream read the whole answer and wrap it.
+        ___
+        ## Args:
+
+        * **body**: The encoded json rpc request
+
+        * **timeout**: (optional) Seconds to wait for the server before giving up
+
+        ## Returns:
+
+        * A context manager giving a tuple of the http status code and a readable response body
+        """
+        status, content = self.post(body, timeout)
+        yield status, io.BytesIO(content)
+
+    def close(self):
+        """
+        Closes any connections held by the transport.
+        """
+
+
+class UnixHTTPConnection(http.client.HTTPConnection):
+    """
+    An *http.client* connection over a Unix domain socket.
+    """
+
+    def __init__(self, path, timeout=None):
+        super().__init__('localhost', timeout=timeout)
+        self.path = path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.path)
+
+
+class HTTPTransport(Transport):
+    """
+    A lean thread-safe keep-alive transport built on *http.client*.
+
+    Idle connections are kept in a pool and reused between calls, connections
+    idle for longer than *idleTimeout* are closed instead of reused.
+    ___
+    ## Args:
+
+    * **host**: The host of the smileycoin rpc server
+
+    * **port**: The port of the smileycoin rpc server
+
+    * **rpcUser**: The rpc user to use when connecting to the server
+
+    * **rpcPassword**: The rpc password to use when connecting to the server
+
+    * **poolMaxSize**: (optional) The maximum number of idle connections kept open
+
+    * **poolBlock**: (optional) If true, at most *poolMaxSize* calls are in flight and further callers wait
+
+    * **idleTimeout**: (optional) Seconds an idle connection may be reused for
+
+    * **keepAlive**: (optional) If false, every connection is closed after its request
+    """
+
+    def __init__(self, host, port, rpcUser, rpcPassword, poolMaxSize=10, poolBlock=False,
+                 idleTimeout=60, keepAlive=True):
+        self.host = host
+        self.port = int(port)
+        self.poolMaxSize = poolMaxSize
+        self.idleTimeout = idleTimeout
+        self.keepAlive = keepAlive
+        self.idle = []
+        self.lock = threading.Lock()
+        self.slots = threading.BoundedSemaphore(poolMaxSize) if poolBlock else None
+        self.headers = {
+            'Content-Type': 'text/plain',
+            'Authorization': basicAuth(rpcUser, rpcPassword),
+            'Connection': 'keep-alive' if keepAlive else 'close'
+        }
+
+    def connect(self):
+        return http.client.HTTPConnection(self.host, self.port)
+
+    def acquire(self):
+        with self.lock:
+            now = time.monotonic()
+            while self.idle:
+                connection, lastUsed = self.idle.pop()
+                if (self.idleTimeout is None or now - lastUsed <= self.idleTimeout) and not isDropped(connection):
+                    return connection
+                connection.close()
+        return self.connect()
+
+    def release(self, connection):
+        with self.lock:
+            if len(self.idle) < self.poolMaxSize:
+                self.idle.append((connection, time.monotonic()))
+                return
+        connection.close()
+
+    def write(self, connection, body, timeout):
+        connection.timeout = timeout
+        if connection.sock is not None:
+            connection.sock.settimeout(timeout)
+        connection.request('POST', '/', body, self.headers)
+
+    def send(self, connection, body, timeout):
+        reused = connection.sock is not None
+        try:
+            self.write(connection, body, timeout)
+        except (ConnectionResetError, BrokenPipeError):
+            # The server closed the idle keep-alive connection before the request was written,
+            # it cannot have been processed so it is written once more on a fresh connection.
+            # Failures after the request was written are left to the retry logic of the client,
+            # which only repeats idempotent calls.
+            connection.close()
+            if not reused:
+                raise
+            connection = self.connect()
+            self.write(connection, body, timeout)
+        return connection, connection.getresponse()
+
+    @contextlib.contextmanager
+    def stream(self, body, timeout=None):
+        if self.slots is not None:
+            self.slots.acquire()
+        try:
+            connection = self.acquire()
+            try:
+                connection, response = self.send(connection, body, timeout)
+                yield response.status, response
+            except BaseException:
+                connection.close()
+                raise
+            # Connections are only reused once their answer has been read to the end
+            if self.keepAlive and not response.will_close and response.isclosed():
+                self.release(connection)
+            else:
+                connection.close()
+        finally:
+            if self.slots is not None:
+                self.slots.release()
+
+    def post(self, body, timeout=None):
+        with self.stream(body, timeout) as (status, response):
+            return status, response.read()
+
+    def close(self):
+        with self.lock:
+            idle, self.idle = self.idle, []
+        for connection, _ in idle:
+            connection.close()
+
+
+class UnixSocketTransport(HTTPTransport):
+    """
+    An *HTTPTransport* that talks to the server over a Unix domain socket,
+    e.g. a local proxy in front of smileycoind.
+    ___
+    ## Args:
+
+    * **path**: The path of the Unix domain socket
+
+    Takes the same optional arguments as *HTTPTransport*.
+    """
+
+    def __init__(self, path, rpcUser, rpcPassword, **kwargs):
+        super().__init__('localhost', 0, rpcUser, rpcPassword, **kwargs)
+        self.path = path
+
+    def connect(self):
+        return UnixHTTPConnection(self.path)
+
+
+class RequestsTransport(Transport):
+    """
+    A thread-safe keep-alive transport built on the optional *requests* library.
+
+    Connections to smileycoind are kept open in a pool and reused between calls instead of
+    opening and tearing down a TCP connection for each request.
+    ___
+    ## Args:
+
+    * **url**: The url of the smileycoin rpc server
+
+    * **rpcUser**: The rpc user to use when connecting to the server
+
+    * **rpcPassword**: The rpc password to use when connecting to the server
+
+    * **poolSize**: (optional) The number of hosts to keep connection pools for
+
+    * **poolMaxSize**: (optional) The maximum number of connections kept open per host
+
+    * **poolBlock**: (optional) If true, callers wait for a free connection instead of opening extra ones
+
+    * **idleTimeout**: (optional) Seconds a pool may sit unused before its connections are closed
+
+    * **keepAlive**: (optional) If false, every connection is closed after its request
+    """
+
+    def __init__(self, url, rpcUser, rpcPassword, poolSize=1, poolMaxSize=10, poolBlock=False,
+                 idleTimeout=60, keepAlive=True):
+        if requests is None:
+            raise ImportError('RequestsTransport requires the requests library')
+        self.url = url
+        self.idleTimeout = idleTimeout
+        self.lastUsed = time.monotonic()
+        self.lock = threading.Lock()
+        self.headers = {
+            'content-type': 'text/plain',
+            'authorization': basicAuth(rpcUser, rpcPassword),
+            'connection': 'keep-alive' if keepAlive else 'close'
+        }
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=poolSize, pool_maxsize=poolMaxSize, pool_block=poolBlock)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def evictIdle(self):
+        """
+        Closes the pooled connections if the transport has been idle for longer than *idleTimeout*.
+        """
+        with self.lock:
+            now = time.monotonic()
+            if self.idleTimeout is not None and now - self.lastUsed > self.idleTimeout:
+                self.session.close()
+            self.lastUsed = now
+
+    def post(self, body, timeout=None):
+        self.evictIdle()
+        response = self.session.post(self.url, headers=self.headers, data=body, timeout=timeout)
+        return response.status_code, response.content
+
+    @contextlib.contextmanager
+    def stream(self, body, timeout=None):
+        self.evictIdle()
+        response = self.session.post(self.url, headers=self.headers, data=body, timeout=timeout, stream=True)
+        try:
+            yield response.status_code, response.raw
+        finally:
+            response.close()
+
+    def close(self):
+        self.session.close()
+
+
+class AsyncTransport:
+    """
+    A non-blocking keep-alive HTTP transport for use with asyncio.
+
+    Connections are opened with `asyncio.open_connection` and returned to a pool after each call.
+    At most *maxInFlight* requests are sent at the same time, further calls wait for a free slot.
+    A call that is cancelled or times out closes its connection instead of returning it to the pool.
+    ___
+    ## Args:
+
+    * **host**: The host of the smileycoin rpc server, ignored when *path* is given
+
+    * **port**: The port of the smileycoin rpc server
+
+    * **rpcUser**: The rpc user to use when connecting to the server
+
+    * **rpcPassword**: The rpc password to use when connecting to the server
+
+    * **maxInFlight**: (optional) The maximum number of concurrent requests and open connections
+
+    * **path**: (optional) The path of a Unix domain socket to connect to instead of host and port
+    """
+
+    def __init__(self, host, port, rpcUser, rpcPassword, maxInFlight=100, path=None):
+        self.host = host
+        self.path = path
+        self.port = int(port)
+        self.idle = []
+        self.semaphore = None
+        self.maxInFlight = maxInFlight
+        self.header = (
+            f'POST / HTTP/1.1\r\n'
+            f'Host: {host}:{port}\r\n'
+            f'Authorization: {basicAuth(rpcUser, rpcPassword)}\r\n'
+            f'Content-Type: text/plain\r\n'
+            f'Connection: keep-alive\r\n'
+        ).encode()
+
+    async def connection(self):
+        while self.idle:
+            reader, writer = self.idle.pop()
+            if not reader.at_eof() and not writer.is_closing():
+                return reader, writer
+            writer.close()
+        if self.path is not None:
+            return await asyncio.open_unix_connection(self.path)
+        return await asyncio.open_connection(self.host, self.port)
+
+    async def exchange(self, reader, writer, body):
+        writer.write(self.header + f'Content-Length: {len(body)}\r\n\r\n'.encode() + body)
+        await writer.drain()
+        statusLine = await reader.readline()
+        if not statusLine:
+            raise ConnectionResetError('Server closed the connection')
+        status = int(statusLine.split()[1])
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+        if 'content-length' in headers:
+            content = await reader.readexactly(int(headers['content-length']))
+        else:
+            content = await reader.read()
+        keepAlive = 'content-length' in headers and headers.get('connection', '').lower() != 'close'
+        return status, content, keepAlive
+
+    async def post(self, body, timeout=None):
+        """
+        Sends an encoded rpc request body to the server.
+        ___
+        ## Args:
+
+        * **body**: The encoded json rpc request
+
+        * **timeout**: (optional) Seconds to wait for the server before giving up
+
+        ## Returns:
+
+        * A tuple of the http status code and the raw response body
+        """
+        if self.semaphore is None:
+            self.semaphore = asyncio.Semaphore(self.maxInFlight)
+        async with self.semaphore:
+            reader, writer = await asyncio.wait_for(self.connection(), timeout)
+            try:
+                status, content, keepAlive = await asyncio.wait_for(self.exchange(reader, writer, body), timeout)
+            except BaseException:
+                writer.close()
+                raise
+            if keepAlive:
+                self.idle.append((reader, writer))
+            else:
+                writer.close()
+            return status, content
+
+    async def close(self):
+        idle, self.idle = self.idle, []
+        for _, writer in idle:
+            writer.close()
@@ -0,0 +1,279 @@
+import math
+import struct
+
+from .addresses import SCRIPT_ADDRESS, decodeAddress
+from .amounts import toSatoshi
+
+# Estimated serialized sizes, inputs are counted signed with a compressed key
+TRANSACTION_OVERHEAD = 10
+INPUT_SIZE = 148
+OUTPUT_OVERHEAD = 9
+
+DEFAULT_FEE_PER_KB = 100000
+DUST_LIMIT = 5460
+MAX_OP_RETURN_SIZE = 80
+
+
+def encodeVarInt(number):
+    if number < 0xfd:
+        return bytes([number])
+    if number <= 0xffff:
+        return b'\xfd' + struct.pack('<H', number)
+    if number <= 0xffffffff:
+        return b'\xfe' + struct.pack('<I', number)
+    return b'\xff' + struct.pack('<Q', number)
+
+
+def addressScript(address):
+    """
+    Returns the output script paying to an address.
+    """
+    version, hash = decodeAddress(address)
+    if version == SCRIPT_ADDRESS:
+        return b'\xa9\x14' + hash + b'\x87'
+    return b'\x76\xa9\x14' + hash + b'\x88\xac'
+
+
+def dataScript(data):
+    """
+    Returns an OP_RETURN output script carrying *data*.
+    """
+    data = data.encode() if isinstance(data, str) else bytes(data)
+    if len(data) > MAX_OP_RETURN_SIZE:
+        raise ValueError(f'OP_RETURN data is limited to {MAX_OP_RETURN_SIZE} bytes')
+    push = bytes([len(data)]) if len(data) < 0x4c else b'\x4c' + bytes([len(data)])
+    return b'\x6a' + push + data
+
+
+def serializeTransaction(inputs, outputs, locktime=0, version=1):
+    """
+    Serializes an unsigned transaction.
+    ___
+    ## Args:
+
+    * **inputs**: A list of dicts with the txid and vout of each spent output, and optionally its sequence
+
+    * **outputs**: A list of (value in satoshis, script bytes) tuples
+
+    ## Returns:
+
+    * The transaction as bytes, with empty input scripts
+    """
+    parts = [struct.pack('<i', version), encodeVarInt(len(inputs))]
+    for spent in inputs:
+        parts.append(bytes.fromhex(spent['txid'])[::-1])
+        parts.append(struct.pack('<I', spent['vout']))
+        parts.append(b'\x00')
+        parts.append(struct.pack('<I', spent.get('sequence', 0xffffffff)))
+    parts.append(encodeVarInt(len(outputs)))
+    for value, script in outputs:
+        parts.append(struct.pack('<q', value))
+        parts.append(encodeVarInt(len(script)))
+        parts.append(script)
+    parts.append(struct.pack('<I', locktime))
+    return b''.join(parts)
+
+
+def estimateSize(inputCount, scripts):
+    return TRANSACTION_OVERHEAD + INPUT_SIZE * inputCount + sum(OUTPUT_OVERHEAD + len(script) for script in scripts)
+
+
+def feeFor(size, feePerKB):
+    return math.ceil(size * feePerKB / 1000)
+
+
+def selectLargestFirst(outputs, target, inputFee):
+    """
+    Takes the largest outputs until they cover *target* plus the fee of spending them.
+    """
+    selected, total = [], 0
+    for output in sorted(outputs, key=lambda output: -output['satoshi']):
+        selected.append(output)
+        total += output['satoshi'] - inputFee
+        if total >= target:
+            return selected
+    return None
+
+
+def selectConsolidating(outputs, target, inputFee, maxInputs=50):
+    """
+    Takes the smallest outputs worth spending until they cover *target*, then keeps adding the next smallest
+    up to *maxInputs* inputs, merging small outputs into the change while fees are low.
+    """
+    selected, total = [], 0
+    for output in sorted(outputs, key=lambda output: output['satoshi']):
+        if output['satoshi'] <= inputFee:
+            continue
+        if total >= target and len(selected) >= maxInputs:
+            break
+        selected.append(output)
+        total += output['satoshi'] - inputFee
+    return selected if total >= target else None
+
+
+def selectBranchAndBound(outputs, target, inputFee, costOfChange, maxTries=100000):
+    """
+    Searches for a set of outputs whose value after input fees lands between *target* and
+    *target* plus *costOfChange*, so no change output is needed. Among the sets found the one
+    wasting the least is returned, or None if the search finds no such set.
+    """
+    pool = sorted(
+        ((output['satoshi'] - inputFee, output) for output in outputs if output['satoshi'] > inputFee),
+        key=lambda pair: -pair[0]
+    )
+    available = sum(value for value, _ in pool)
+    if available < target:
+        return None
+    selection, value, best, bestWaste = [], 0, None, None
+    for _ in range(maxTries):
+        backtrack = False
+        if value + available < target or value > target + costOfChange:
+            backtrack = True
+        elif value >= target:
+            if bestWaste is None or value - target <= bestWaste:
+                best, bestWaste = [pool[index][1] for index, taken in enumerate(selection) if taken], value - target
+            backtrack = True
+        if backtrack:
+            while selection and not selection[-1]:
+                selection.pop()
+                available += pool[len(selection)][0]
+            if not selection:
+                break
+            selection[-1] = False
+            value -= pool[len(selection) - 1][0]
+        else:
+            current = pool[len(selection)][0]
+            available -= current
+            # Excluding an output and then including one of the same value explores the same sets twice
+            if selection and not selection[-1] and current == pool[len(selection) - 1][0]:
+                selection.append(False)
+            else:
+                selection.append(True)
+                value += current
+    return best
+
+
+STRATEGIES = ('branchAndBound', 'largestFirst', 'consolidating')
+
+
+class TransactionBuilder:
+    """
+    Builds unsigned transactions locally: selects the inputs, estimates the size and fee, adds change
+    and serializes the transaction, without *listunspent* or *createrawtransaction* round trips per spend.
+
+    Inputs are chosen from a *UTXOIndex* when one is given, otherwise from *listunspent*.
+    The *branchAndBound* strategy looks for inputs that match the payments closely enough to need no change
+    and falls back to *largestFirst*, *consolidating* spends many small outputs at once.
+    Amounts are integer satoshis unless noted otherwise.
+    ```
+    builder = TransactionBuilder(smileyObject, utxos=index)
+    built = builder.build({'B8...': 12.5}, data='order 1234')
+    signed = smileyObject.signrawtransaction(built['hex'])
+    ```
+    ___
+    ## Args:
+
+    * **client**: The smiley client, used for *listunspent* and change addresses
+
+    * **utxos**: (optional) A *UTXOIndex* to select inputs from
+
+    * **feePerKB**: (optional) The fee rate in satoshis per 1000 bytes
+
+    * **strategy**: (optional) The default coin selection strategy, one of *STRATEGIES*
+
+    * **changeAddress**: (optional) The address change is paid to, a new one is asked for per transaction by default
+
+    * **minconf**: (optional) Only spend outputs with at least this many confirmations
+    """
+
+    def __init__(self, client, utxos=None, feePerKB=DEFAULT_FEE_PER_KB, strategy='branchAndBound',
+                 changeAddress=None, minconf=1):
+        self.client = client
+        self.utxos = utxos
+        self.feePerKB = feePerKB
+        self.strategy = strategy
+        self.changeAddress = changeAddress
+        self.minconf = minconf
+
+    def candidates(self, exclude=()):
+        if self.utxos is not None:
+            outputs = self.utxos.range(minconf=self.minconf)
+        else:
+            outputs = [
+                {'txid': entry['txid'], 'vout': entry['vout'], 'address': entry.get('address'),
+                 'satoshi': toSatoshi(entry['amount'])}
+                for entry in self.client.listunspent(self.minconf) or [] if entry.get('spendable', True)
+            ]
+        return [output for output in outputs if (output['txid'], output['vout']) not in exclude]
+
+    def select(self, outputs, strategy, target, scripts, changeScript):
+        inputFee = feeFor(INPUT_SIZE, self.feePerKB)
+        fixedFee = feeFor(estimateSize(0, scripts), self.feePerKB)
+        changeFee = feeFor(OUTPUT_OVERHEAD + len(changeScript), self.feePerKB)
+        if strategy == 'branchAndBound':
+            selected = selectBranchAndBound(outputs, target + fixedFee, inputFee, changeFee + inputFee)
+            if selected is not None:
+                return selected
+            strategy = 'largestFirst'
+        if strategy == 'largestFirst':
+            return selectLargestFirst(outputs, target + fixedFee + changeFee, inputFee)
+        if strategy == 'consolidating':
+            return selectConsolidating(outputs, target + fixedFee + changeFee, inputFee)
+        raise ValueError(f'Unknown coin selection strategy: {strategy!r}')
+
+    def build(self, payments, data=None, strategy=None, changeAddress=None, exclude=(), inputs=None):
+        """
+        Builds an unsigned transaction.
+        ___
+        ## Args:
+
+        * **payments**: A dict of smileycoin addresses and amounts in smileycoins, like *sendmany*
+
+        * **data**: (optional) Bytes or a string to carry in an OP_RETURN output
+
+        * **strategy**: (optional) The coin selection strategy, defaults to the one of the builder
+
+        * **changeAddress**: (optional) The address change is paid to
+
+        * **exclude**: (optional) (txid, vout) tuples of outputs not to spend, e.g. outputs reserved elsewhere
+
+        * **inputs**: (optional) The outputs to spend, skipping coin selection, as dicts with txid, vout and satoshi
+
+        ## Returns:
+
+        * A dict with the hex of the transaction, the spent *inputs*, the *fee*, the *change* and the estimated signed *size*
+        """
+        outputs = [(toSatoshi(amount), addressScript(address)) for address, amount in payments.items()]
+        if any(value <= 0 for value, _ in outputs):
+            raise ValueError('Payment amounts must be positive')
+        if data is not None:
+            outputs.append((0, dataScript(data)))
+        target = sum(value for value, _ in outputs)
+        scripts = [script for _, script in outputs]
+        changeAddress = changeAddress or self.changeAddress
+        # A placeholder script of the right size until a change address is needed
+        changeScript = addressScript(changeAddress) if changeAddress else b'\0' * 25
+        if inputs is None:
+            inputs = self.select(self.candidates(exclude), strategy or self.strategy, target, scripts, changeScript)
+            if inputs is None:
+                raise ValueError('Insufficient funds')
+        total = sum(output['satoshi'] for output in inputs)
+        fee = feeFor(estimateSize(len(inputs), scripts), self.feePerKB)
+        change = total - target - feeFor(estimateSize(len(inputs), scripts + [changeScript]), self.feePerKB)
+        if change >= DUST_LIMIT:
+            if changeAddress is None:
+                changeScript = addressScript(self.client.getrawchangeaddress())
+            outputs.append((change, changeScript))
+            fee = total - target - change
+        elif total - target < fee:
+            raise ValueError('Insufficient funds')
+        else:
+            change, fee = 0, total - target
+        raw = serializeTransaction(inputs, outputs)
+        return {
+            'hex': raw.hex(),
+            'inputs': inputs,
+            'fee': fee,
+            'change': change,
+            'size': estimateSize(len(inputs), [script for _, script in outputs])
+        }
@@ -0,0 +1,190 @@
+import json
+import threading
+from datetime import datetime
+from .amounts import toSatoshi
+from .database import LocalConnections
+
+SCHEMA = [
+    'CREATE TABLE IF NOT EXISTS entries ('
+    ' txid TEXT NOT NULL, category TEXT NOT NULL, address TEXT NOT NULL DEFAULT \'\', vout INTEGER NOT NULL DEFAULT -1,'
+    ' account TEXT, amount INTEGER NOT NULL, fee INTEGER, time INTEGER, blockhash TEXT, blockheight INTEGER,'
+    ' conflicted INTEGER NOT NULL DEFAULT 0, data TEXT NOT NULL,'
+    ' PRIMARY KEY (txid, category, address, vout))',
+    'CREATE INDEX IF NOT EXISTS entriesAddress ON entries (address, time)',
+    'CREATE INDEX IF NOT EXISTS entriesAccount ON entries (account, time)',
+    'CREATE INDEX IF NOT EXISTS entriesTime ON entries (time)',
+    'CREATE INDEX IF NOT EXISTS entriesHeight ON entries (blockheight)',
+    'CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)'
+]
+
+
+def timestamp(value):
+    return int(value.timestamp()) if isinstance(value, datetime) else value
+
+
+class TransactionStore:
+    """
+    A local SQLite store of the wallet transactions, indexed by address, account, txid, time and confirmation status,
+    so questions like "all payments to address X in the last week" are answered without calling smileycoind.
+
+    *sync* asks *listsinceblock* for the transactions since the *lastblock* cursor of the previous sync and
+    stores it with them. The cursor is kept *targetConfirmations* blocks behind the tip, so the most recent
+    blocks are listed again on the next sync and transactions moved by a reorg are updated. Unconfirmed
+    transactions the node no longer lists are deleted. Amounts are stored as integer satoshis.
+    ```
+    store = TransactionStore(smileyObject, 'wallet.db')
+    store.sync()
+    store.query(address='B8...', category='receive', since=datetime.now() - timedelta(days=7))
+    ```
+    ___
+    ## Args:
+
+    * **client**: The smiley client to read the wallet with
+
+    * **path**: The path of the database file, created if it does not exist
+
+    * **targetConfirmations**: (optional) The number of recent blocks listed again on every sync
+    """
+
+    def __init__(self, client, path, targetConfirmations=6):
+        self.client = client
+        self.path = path
+        self.targetConfirmations = targetConfirmations
+        self.connection = LocalConnections(path, rows=True)
+        self.lock = threading.Lock()
+        connection = self.connection()
+        with connection:
+            for statement in SCHEMA:
+                connection.execute(statement)
+
+    @property
+    def cursor(self):
+        row = self.connection().execute("SELECT value FROM meta WHERE key = 'lastblock'").fetchone()
+        return row[0] if row else None
+
+    @property
+    def height(self):
+        row = self.connection().execute("SELECT value FROM meta WHERE key = 'height'").fetchone()
+        return int(row[0]) if row else 0
+
+    def sync(self):
+        """
+        Stores the wallet transactions since the last sync.
+        ___
+        ## Returns:
+
+        * The number of transaction entries stored or updated
+        """
+        with self.lock:
+            height = self.client.getblockcount()
+            since = self.client.listsinceblock(self.cursor, self.targetConfirmations)
+            since = since or {}
+            rows = []
+            listed = set()
+            for entry in since.get('transactions', []):
+                confirmations = entry.get('confirmations', 0)
+                key = (entry['txid'], entry.get('category', ''), entry.get('address') or '', entry.get('vout', -1))
+                listed.add(key)
+                rows.append(key + (
+                    entry.get('account'),
+                    toSatoshi(entry.get('amount', 0)),
+                    toSatoshi(entry['fee']) if 'fee' in entry else None,
+                    entry.get('time'),
+                    entry.get('blockhash'),
+                    height - confirmations + 1 if confirmations > 0 else None,
+                    1 if confirmations < 0 else 0,
+                    json.dumps(entry)
+                ))
+            connection = self.connection()
+            with connection:
+                connection.executemany('INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)', rows)
+                unconfirmed = connection.execute(
+                    'SELECT txid, category, address, vout FROM entries WHERE blockheight IS NULL AND conflicted = 0'
+                ).fetchall()
+                stale = [tuple(row) for row in unconfirmed if tuple(row) not in listed]
+                connection.executemany(
+                    'DELETE FROM entries WHERE txid = ? AND category = ? AND address = ? AND vout = ?', stale
+                )
+                if since.get('lastblock'):
+                    connection.execute(
+                        "INSERT OR REPLACE INTO meta VALUES ('lastblock', ?)", (since['lastblock'],)
+                    )
+                connection.execute("INSERT OR REPLACE INTO meta VALUES ('height', ?)", (height,))
+            return len(rows)
+
+    def query(self, address=None, account=None, txid=None, category=None, since=None, until=None,
+              minconf=None, includeConflicted=False, limit=None):
+        """
+        Finds stored transaction entries, newest first.
+        ___
+        ## Args:
+
+        * **address**: (optional) Only entries of this address
+
+        * **account**: (optional) Only entries of this account
+
+        * **txid**: (optional) Only entries of this transaction
+
+        * **category**: (optional) Only entries of this category, e.g. *receive* or *send*
+
+        * **since**: (optional) A datetime or unix timestamp, only entries at or after it
+
+        * **until**: (optional) A datetime or unix timestamp, only entries before it
+
+        * **minconf**: (optional) Only entries with at least this many confirmations as of the last sync, 0 for unconfirmed only
+
+        * **includeConflicted**: (optional) If true conflicted entries are included
+
+        * **limit**: (optional) The maximum number of entries
+
+        ## Returns:
+
+        * A list of the entries as returned by *listsinceblock*, amounts in satoshis under *satoshi* and *feeSatoshi*
+        """
+        conditions, params = [], []
+        for column, value in (('address', address), ('account', account), ('txid', txid), ('category', category)):
+            if value is not None:
+                conditions.append(f'{column} = ?')
+                params.append(value)
+        if since is not None:
+            conditions.append('time >= ?')
+            params.append(timestamp(since))
+        if until is not None:
+            conditions.append('time < ?')
+            params.append(timestamp(until))
+        if minconf == 0:
+            conditions.append('blockheight IS NULL')
+        elif minconf is not None:
+            conditions.append('blockheight <= ?')
+            params.append(self.height - minconf + 1)
+        if not includeConflicted:
+            conditions.append('conflicted = 0')
+        sql = 'SELECT data, amount, fee FROM entries'
+        if conditions:
+            sql += ' WHERE ' + ' AND '.join(conditions)
+        sql += ' ORDER BY time DESC'
+        if limit is not None:
+            sql += f' LIMIT {int(limit)}'
+        entries = []
+        for row in self.connection().execute(sql, params):
+            entry = json.loads(row['data'])
+            entry['satoshi'] = row['amount']
+            entry['feeSatoshi'] = row['fee']
+            entries.append(entry)
+        return entries
+
+    def balance(self, address, since=None, until=None):
+        """
+        ## Returns:
+
+        * The sum in satoshis of the non conflicted entries of an address in the time range
+        """
+        conditions, params = ['address = ?', 'conflicted = 0'], [address]
+        if since is not None:
+            conditions.append('time >= ?')
+            params.append(timestamp(since))
+        if until is not None:
+            conditions.append('time < ?')
+            params.append(timestamp(until))
+        sql = 'SELECT COALESCE(SUM(amount), 0) FROM entries WHERE ' + ' AND '.join(conditions)
+        return self.connection().execute(sql, params).fetchone()[0]
@@ -0,0 +1,265 @@
+import bisect
+import threading
+from .amounts import toSatoshi
+
+# Wallet transaction categories that create outputs paying to the wallet
+RECEIVE_CATEGORIES = frozenset(['receive', 'generate', 'immature'])
+
+# The number of blocks before a coinbase output can be spent
+COINBASE_MATURITY = 100
+
+
+def isImmature(transaction):
+    return any(detail.get('category') == 'immature' for detail in transaction.get('details', []))
+
+
+class UTXOIndex:
+    """
+    A local index of the unspent outputs of the wallet.
+
+    It is bootstrapped once from *listunspent* and then kept current by *sync*, which asks
+    *listsinceblock* for the wallet transactions since the last sync, mempool transactions included,
+    and applies the inputs they spend and the outputs they pay to the wallet. When the block the index
+    was last synced to has been reorganised out of the main chain, a transaction becomes conflicted, or a
+    mempool transaction it applied has been dropped, the index is rebuilt from *listunspent*.
+    Coinbase outputs are only indexed once they have matured and can be spent.
+
+    Outputs are looked up by outpoint in O(1), balances per address in time proportional to the number
+    of outputs of the address, and outputs in an amount range by bisection. Amounts are integer satoshis.
+    ```
+    index = UTXOIndex(smileyObject)
+    index.sync()
+    index.balance('B8...', minconf=1)
+    ```
+    ___
+    ## Args:
+
+    * **client**: The smiley client to read the wallet with
+
+    * **addresses**: (optional) Only index outputs paying to these addresses
+    """
+
+    def __init__(self, client, addresses=None):
+        self.client = client
+        self.addresses = set(addresses) if addresses else None
+        self.lock = threading.RLock()
+        self.outputs = {}
+        self.byAddress = {}
+        self.byAmount = []
+        self.pending = set()
+        self.immature = set()
+        self.conflicted = set()
+        self.mine = {}
+        self.cursor = None
+        self.height = 0
+
+    def add(self, txid, vout, address, satoshi, height, entry=None):
+        outpoint = (txid, vout)
+        if outpoint in self.outputs:
+            self.outputs[outpoint]['height'] = height
+            return
+        self.outputs[outpoint] = {
+            'txid': txid,
+            'vout': vout,
+            'address': address,
+            'satoshi': satoshi,
+            'height': height,
+            'scriptPubKey': (entry or {}).get('scriptPubKey'),
+            'account': (entry or {}).get('account')
+        }
+        self.byAddress.setdefault(address, set()).add(outpoint)
+        bisect.insort(self.byAmount, (satoshi, outpoint))
+
+    def remove(self, outpoint):
+        output = self.outputs.pop(outpoint, None)
+        if output is None:
+            return
+        outpoints = self.byAddress.get(output['address'])
+        outpoints.discard(outpoint)
+        if not outpoints:
+            del self.byAddress[output['address']]
+        position = bisect.bisect_left(self.byAmount, (output['satoshi'], outpoint))
+        del self.byAmount[position]
+
+    def confirmedHeight(self, confirmations):
+        return self.height - confirmations + 1 if confirmations and confirmations > 0 else None
+
+    def bootstrap(self):
+        """
+        Rebuilds the index from *listunspent*.
+        """
+        with self.lock:
+            cursor = self.client.getbestblockhash()
+            self.height = self.client.getblockcount()
+            unspent = self.client.listunspent(0, 9999999, sorted(self.addresses) if self.addresses else [])
+            self.outputs, self.byAddress, self.byAmount, self.pending, self.mine = {}, {}, [], set(), {}
+            for entry in unspent or []:
+                height = self.confirmedHeight(entry.get('confirmations'))
+                self.add(entry['txid'], entry['vout'], entry.get('address'), toSatoshi(entry['amount']), height, entry)
+            # listunspent leaves out coinbase outputs that cannot be spent yet, sync adds them once they can
+            maturing = self.client.getblockhash(max(0, self.height - COINBASE_MATURITY))
+            self.immature = {
+                entry['txid'] for entry in (self.client.listsinceblock(maturing) or {}).get('transactions', [])
+                if entry.get('category') == 'immature'
+            }
+            self.cursor = cursor
+
+    def sync(self):
+        """
+        Applies the wallet transactions since the last sync, bootstrapping the index first if needed.
+        ___
+        ## Returns:
+
+        * The number of transactions applied
+        """
+        with self.lock:
+            if self.cursor is None:
+                self.bootstrap()
+            if (self.client.getblock(self.cursor) or {}).get('confirmations', -1) < 0:
+                self.bootstrap()
+            self.height = self.client.getblockcount()
+            since = self.client.listsinceblock(self.cursor) or {}
+            received = {}
+            confirmations = {}
+            for entry in since.get('transactions', []):
+                txid = entry['txid']
+                confirmations[txid] = entry.get('confirmations', 0)
+                if entry.get('category') in RECEIVE_CATEGORIES:
+                    received.setdefault(txid, set()).add(entry.get('address'))
+            # Conflicted transactions are listed on every sync, only newly conflicted ones need a rebuild
+            conflicted = {txid for txid, count in confirmations.items() if count < 0}
+            dropped = self.pending - set(confirmations)
+            if conflicted - self.conflicted or dropped:
+                self.bootstrap()
+                self.conflicted = conflicted
+                return len(confirmations)
+            # Mempool transactions are listed again on every sync, they only need applying once more when confirmed
+            changed = [
+                txid for txid, count in confirmations.items()
+                if count >= 0 and not (count == 0 and txid in self.pending)
+            ]
+            # Maturing coinbase transactions are looked at on every sync until their outputs can be spent
+            changed += sorted(self.immature - set(changed))
+            for addresses in received.values():
+                self.mine.update(dict.fromkeys(addresses, True))
+            transactions, decoded = self.decode(changed)
+            self.immature = {txid for txid, transaction in zip(changed, transactions) if isImmature(transaction)}
+            spendable = [(txid, transaction) for txid, transaction in zip(changed, decoded) if txid not in self.immature]
+            unspent = self.unspentOutputs([txid for txid, _ in spendable], [transaction for _, transaction in spendable])
+            for txid, transaction, walletTransaction in zip(changed, decoded, transactions):
+                self.apply(txid, transaction, unspent, confirmations.get(txid, walletTransaction.get('confirmations', 0)))
+            self.cursor = since.get('lastblock', self.cursor)
+            return len(changed)
+
+    def decode(self, txids):
+        """
+        ## Returns:
+
+        * The wallet transactions as returned by *gettransaction* and the decoded transactions, as a tuple of lists
+        """
+        with self.client.batch() as batch:
+            futures = [batch.gettransaction(txid) for txid in txids]
+        transactions = [future.result() for future in futures]
+        with self.client.batch() as batch:
+            decoded = [batch.decoderawtransaction(transaction['hex']) for transaction in transactions]
+        return transactions, [future.result() for future in decoded]
+
+    def outputAddress(self, output):
+        addresses = output.get('scriptPubKey', {}).get('addresses', [])
+        return addresses[0] if len(addresses) == 1 else None
+
+    def unspentOutputs(self, txids, decoded):
+        """
+        Finds the outputs of the transactions that pay to the wallet and are still unspent.
+        Ownership is decided from the outputs themselves, the wallet lists neither the change of its own
+        spends nor self transfers as received. Unknown addresses are checked with batched *validateaddress*
+        calls and remembered, the outputs are checked with batched *gettxout* calls.
+        """
+        candidates = [
+            (txid, output['n'], self.outputAddress(output))
+            for txid, transaction in zip(txids, decoded) for output in transaction.get('vout', [])
+        ]
+        candidates = [
+            candidate for candidate in candidates
+            if candidate[2] is not None and (not self.addresses or candidate[2] in self.addresses)
+        ]
+        unknown = sorted({address for _, _, address in candidates if address not in self.mine})
+        if unknown:
+            with self.client.batch() as batch:
+                futures = [batch.validateaddress(address) for address in unknown]
+            for address, future in zip(unknown, futures):
+                self.mine[address] = bool((future.result() or {}).get('ismine'))
+        owned = [(txid, vout) for txid, vout, address in candidates if self.mine[address]]
+        with self.client.batch() as batch:
+            futures = [batch.gettxout(txid, vout, True) for txid, vout in owned]
+        return {outpoint for outpoint, future in zip(owned, futures) if future.result() is not None}
+
+    def apply(self, txid, decoded, unspent, confirmations):
+        for spent in decoded.get('vin', []):
+            if 'txid' in spent:
+                self.remove((spent['txid'], spent['vout']))
+        height = self.confirmedHeight(confirmations)
+        for output in decoded.get('vout', []):
+            if (txid, output['n']) in unspent:
+                self.add(txid, output['n'], self.outputAddress(output), toSatoshi(output['value']), height, output)
+        if confirmations == 0:
+            self.pending.add(txid)
+        else:
+            self.pending.discard(txid)
+
+    def get(self, txid, vout):
+        """
+        ## Returns:
+
+        * The unspent output at the outpoint, or None if the wallet has no unspent output there
+        """
+        with self.lock:
+            return self.outputs.get((txid, vout))
+
+    def isMature(self, output, minconf):
+        if minconf <= 0:
+            return True
+        return output['height'] is not None and self.height - output['height'] + 1 >= minconf
+
+    def balance(self, address, minconf=0):
+        """
+        ## Args:
+
+        * **address**: The smileycoin address
+
+        * **minconf**: (optional) Only count outputs with at least this many confirmations
+
+        ## Returns:
+
+        * The balance of the address in satoshis
+        """
+        with self.lock:
+            outputs = (self.outputs[outpoint] for outpoint in self.byAddress.get(address, ()))
+            return sum(output['satoshi'] for output in outputs if self.isMature(output, minconf))
+
+    def range(self, minimum=0, maximum=None, minconf=0):
+        """
+        ## Args:
+
+        * **minimum**: (optional) The smallest amount in satoshis
+
+        * **maximum**: (optional) The largest amount in satoshis
+
+        * **minconf**: (optional) Only return outputs with at least this many confirmations
+
+        ## Returns:
+
+        * The unspent outputs with an amount between *minimum* and *maximum*, smallest first
+        """
+        with self.lock:
+            start = bisect.bisect_left(self.byAmount, (minimum,))
+            end = len(self.byAmount) if maximum is None else bisect.bisect_left(self.byAmount, (maximum + 1,))
+            outputs = [self.outputs[outpoint] for _, outpoint in self.byAmount[start:end]]
+            return [output for output in outputs if self.isMature(output, minconf)]
+
+    def __len__(self):
+        return len(self.outputs)
+
+    def __iter__(self):
+        with self.lock:
+            return iter(list(self.outputs.values()))
@@ -0,0 +1,61 @@
+import threading
+import warnings
+
+
+class Worker:
+    """
+    Base class of the helpers that repeat a unit of work on a background daemon thread, every *interval*
+    seconds or right away when woken. Subclasses implement *work* and name it in *workName*.
+    A failed run keeps its exception in *error* and is reported as a warning, the thread carries on.
+    ___
+    ## Args:
+
+    * **interval**: Seconds between runs
+    """
+
+    workName = 'work'
+
+    def __init__(self, interval):
+        self.interval = interval
+        self.error = None
+        self.woken = threading.Event()
+        self.stopped = threading.Event()
+        self.thread = None
+
+    def work(self):
+        raise NotImplementedError
+
+    def wake(self):
+        """
+        Makes the background thread run right away.
+        """
+        self.woken.set()
+
+    def run(self):
+        while not self.stopped.is_set():
+            try:
+                self.work()
+                self.error = None
+            except Exception as error:
+                self.error = error
+                warnings.warn(f'{type(self).__name__} {self.workName} failed: {error}')
+            self.woken.wait(self.interval)
+            self.woken.clear()
+
+    def start(self):
+        """
+        Starts running on a background daemon thread.
+        """
+        self.stopped.clear()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+        return self.thread
+
+    def stop(self):
+        """
+        Stops the background thread after its current run.
+        """
+        self.stopped.set()
+        self.woken.set()
+        if self.thread is not None:
+            self.thread.join()
@@ -0,0 +1,125 @@
+import os
+import tempfile
+import unittest
+from concurrent.futures import Future
+
+from smileyLib.addresses import hashToAddress
+from smileyLib.errors import RPCError
+from smileyLib.payouts import FAILED, SENDING, SENT, PayoutQueue
+
+
+class FakeBatch:
+    def __init__(self, client):
+        self.client = client
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, excType, excValue, traceback):
+        pass
+
+    def sendmany(self, *params):
+        future = Future()
+        try:
+            future.set_result(self.client.send(*params))
+        except RPCError as error:
+            future.set_exception(error)
+        return future
+
+
+class FakeWallet:
+    """
+    Answers the calls of a PayoutQueue the way the smiley client would, *refuse* makes sendmany fail with
+    an rpc error, *lost* drops the answer of a sendmany that went through and *unreachable* makes the
+    transaction history unavailable. Like the client the plain sendmany wrapper answers a refusal with
+    None, only the batched call raises.
+    """
+
+    def __init__(self):
+        self.sent = []
+        self.refuse = False
+        self.lost = False
+        self.unreachable = False
+
+    def batch(self, chunkSize=500):
+        return FakeBatch(self)
+
+    def sendmany(self, *params):
+        try:
+            return self.send(*params)
+        except RPCError:
+            return None
+
+    def send(self, fromAccount, amounts, minconf, comment):
+        if self.refuse:
+            raise RPCError('sendmany', -6, 'Insufficient funds')
+        txid = f'tx{len(self.sent)}'
+        self.sent.append((txid, amounts, comment))
+        if self.lost:
+            raise ConnectionResetError('Connection lost before the answer')
+        return txid
+
+    def iterTransactions(self, account='*', since=None):
+        if self.unreachable:
+            raise RPCError('listtransactions', None, 'No result for the page at offset 0')
+        for txid, amounts, comment in reversed(self.sent):
+            for address, amount in amounts.items():
+                yield {'txid': txid, 'category': 'send', 'address': address, 'amount': -amount, 'comment': comment}
+
+
+class PayoutQueueTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'payouts.db')
+        self.wallet = FakeWallet()
+        self.queue = PayoutQueue(self.wallet, self.path)
+        self.address = hashToAddress(bytes(20))
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def testSent(self):
+        future = self.queue.submit(self.address, 1.5)
+        self.queue.flush()
+        self.assertEqual(future.result(0), 'tx0')
+        self.assertEqual(self.queue.status(future.paymentId)['state'], SENT)
+
+    def testRefusedBatchFails(self):
+        self.wallet.refuse = True
+        future = self.queue.submit(self.address, 1.5)
+        self.queue.flush()
+        status = self.queue.status(future.paymentId)
+        self.assertEqual(status['state'], FAILED)
+        self.assertIsNone(status['txid'])
+        self.assertIn('Insufficient funds', status['error'])
+        self.assertRaises(RuntimeError, future.result, 0)
+        self.assertEqual(self.wallet.sent, [])
+
+    def testLostAnswerIsRecovered(self):
+        self.wallet.lost = True
+        future = self.queue.submit(self.address, 1.5)
+        self.assertRaises(ConnectionResetError, self.queue.flush)
+        self.assertEqual(self.queue.status(future.paymentId)['state'], SENDING)
+        self.wallet.lost = False
+        PayoutQueue(self.wallet, self.path).flush()
+        self.assertEqual(self.queue.status(future.paymentId)['state'], SENT)
+        self.assertEqual(len(self.wallet.sent), 1)
+
+    def testUnsearchableWalletKeepsBatchSending(self):
+        self.wallet.lost = True
+        future = self.queue.submit(self.address, 1.5)
+        self.assertRaises(ConnectionResetError, self.queue.flush)
+        self.wallet.lost = False
+        self.wallet.unreachable = True
+        queue = PayoutQueue(self.wallet, self.path)
+        self.assertRaises(RPCError, queue.flush)
+        self.assertEqual(queue.status(future.paymentId)['state'], SENDING)
+        self.assertEqual(len(self.wallet.sent), 1)
+        self.wallet.unreachable = False
+        queue.flush()
+        self.assertEqual(queue.status(future.paymentId)['state'], SENT)
+        self.assertEqual(len(self.wallet.sent), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()